@@ -0,0 +1,173 @@
+"""Time every dashboard page on the real and synthetic datasets.
+
+Each page runs headless through Streamlit's AppTest in its own process,
+once cold and once warm, for every requested scale of the data. Sections
+are delimited by the page's ``st.header`` calls. For every section the
+wall time and the JSON size of its Plotly figures are reported, and for
+every page the peak memory of its process. The run fails when a figure is
+above ``MAX_FIGURE_BYTES`` of JSON.
+
+    python -m benchmarks.run --scales 1 10 100 --output bench.jsonl
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.synthetic import generate
+from dashboard.figures import MAX_FIGURE_BYTES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = [
+    "1_HR_Analytics.py",
+    "pages/2_Library_Analytics.py",
+    "pages/3_Student_Analytics.py",
+    "pages/4_Campus_Analytics.py",
+]
+SCALED_DATA_DIR = os.path.join(ROOT, "benchmarks", ".data")
+
+
+class SectionRecorder:
+    """Splits a page run into sections at each ``st.header`` call."""
+
+    def __init__(self):
+        self.sections = []
+
+    def start(self):
+        self.sections = [{"section": "(load)", "start": time.perf_counter(), "overhead": 0.0, "payload_bytes": 0, "over_budget": []}]
+
+    def header(self, body):
+        self.sections.append({"section": body, "start": time.perf_counter(), "overhead": 0.0, "payload_bytes": 0, "over_budget": []})
+
+    def chart(self, size, overhead):
+        self.sections[-1]["payload_bytes"] += size
+        self.sections[-1]["overhead"] += overhead
+        if size > MAX_FIGURE_BYTES:
+            self.sections[-1]["over_budget"].append(size)
+
+    def finish(self):
+        end = time.perf_counter()
+        results = []
+        for section, following in zip(self.sections, self.sections[1:] + [None]):
+            stop = end if following is None else following["start"]
+            results.append({
+                "section": section["section"],
+                "seconds": round(stop - section["start"] - section["overhead"], 6),
+                "payload_bytes": section["payload_bytes"],
+                "over_budget": section["over_budget"],
+            })
+        return results
+
+
+def _instrument(recorder):
+    import plotly.io
+    import streamlit as st
+
+    header, plotly_chart = st.header, st.plotly_chart
+
+    def timed_header(body, *args, **kwargs):
+        recorder.header(body)
+        return header(body, *args, **kwargs)
+
+    def measured_plotly_chart(figure_or_data, *args, **kwargs):
+        start = time.perf_counter()
+        size = len(plotly.io.to_json(figure_or_data, validate=False))
+        recorder.chart(size, time.perf_counter() - start)
+        return plotly_chart(figure_or_data, *args, **kwargs)
+
+    st.header = timed_header
+    st.plotly_chart = measured_plotly_chart
+
+
+def run_worker(page, scale):
+    """Run one page cold then warm and print one JSON line per section."""
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    recorder = SectionRecorder()
+    _instrument(recorder)
+    app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=3600)
+    for run in ("cold", "warm"):
+        recorder.start()
+        app.run()
+        errors = [str(exception.value) for exception in app.exception]
+        for section in recorder.finish():
+            print(json.dumps({"page": page, "scale": scale, "run": run, **section, "errors": errors}))
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"page": page, "scale": scale, "run": "process", "section": "(peak memory)", "peak_mb": round(peak_mb, 1)}))
+
+
+def run_page(page, scale, data_dir):
+    env = dict(os.environ, DASHBOARD_DATA_DIR=data_dir)
+    # A service listening on an inherited socket would answer from other data
+    env.pop("DASHBOARD_SOCKET", None)
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--worker", page, "--scales", str(scale)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return [json.loads(line) for line in completed.stdout.splitlines() if line.startswith("{")]
+
+
+def data_dir_for(scale, regenerate):
+    if scale == 1:
+        return os.path.join(ROOT, "data")
+    data_dir = os.path.join(SCALED_DATA_DIR, f"x{scale}")
+    if regenerate or not os.path.isdir(data_dir):
+        generate(scale, data_dir)
+    return data_dir
+
+
+def over_budget(records):
+    """Return the ``(page, scale, section, bytes)`` of every figure above the payload budget."""
+    return [(record["page"], record["scale"], record["section"], size)
+            for record in records for size in record.get("over_budget", [])]
+
+
+def summarize(records):
+    print(f"{'page':32} {'scale':>6} {'cold s':>8} {'warm s':>8} {'peak MB':>8} {'payload KB':>10}")
+    pages = sorted({(record["page"], record["scale"]) for record in records}, key=lambda key: (key[1], key[0]))
+    for page, scale in pages:
+        rows = [record for record in records if record["page"] == page and record["scale"] == scale]
+        cold = sum(row["seconds"] for row in rows if row["run"] == "cold")
+        warm = sum(row["seconds"] for row in rows if row["run"] == "warm")
+        payload = sum(row["payload_bytes"] for row in rows if row["run"] == "warm")
+        peak = next(row["peak_mb"] for row in rows if row["run"] == "process")
+        errors = next((row["errors"] for row in rows if row.get("errors")), None)
+        print(f"{page:32} {scale:>6} {cold:>8.3f} {warm:>8.3f} {peak:>8.1f} {payload / 1024:>10.1f}" + (f"  ERROR: {errors[0]}" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="data scales to run, 1 is the real data")
+    parser.add_argument("--pages", nargs="+", default=PAGES, help="page scripts to run")
+    parser.add_argument("--regenerate", action="store_true", help="regenerate the synthetic datasets")
+    parser.add_argument("--output", help="write every section timing to this JSON lines file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.scales[0])
+        return
+
+    records = []
+    for scale in args.scales:
+        data_dir = data_dir_for(scale, args.regenerate)
+        for page in args.pages:
+            records.extend(run_page(page, scale, data_dir))
+    if args.output:
+        with open(args.output, "w") as output:
+            for record in records:
+                output.write(json.dumps(record) + "\n")
+    summarize(records)
+    oversized = over_budget(records)
+    for page, scale, section, size in oversized:
+        print(f"{page} at scale {scale}: a figure in {section!r} is {size} bytes, above the {MAX_FIGURE_BYTES} byte budget")
+    if oversized:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Draw every View By and Split By pair of the category charts headless.
+
+The student and campus pages run through Streamlit's AppTest once for each
+pair of their two selectboxes, with no filter and under every selection of
+``SELECTIONS``, and every pair that raises is reported.
+
+    python -m benchmarks.splits
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The labels of the View By and Split By selectboxes of each page
+PAGES = {
+    "pages/3_Student_Analytics.py": ("View Students By:", "Split By:"),
+    "pages/4_Campus_Analytics.py": ("View Placed Students By:", "Split By:"),
+}
+
+# Sidebar filters that leave categories without rows
+SELECTIONS = [
+    {},
+    {"department": "Tamil"},
+    {"graduation_type": "PG"},
+    {"year": 2018, "department": "Tamil"},
+    {"year": 2018, "graduation_type": "PG"},
+]
+
+
+def _selectbox(app, label):
+    return next(box for box in app.selectbox if box.label == label)
+
+
+def _open(page, selection):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=600)
+    # The filter bar starts from the values remembered in the session
+    for name, value in selection.items():
+        app.session_state[f"filter_{name}"] = value
+    return app.run()
+
+
+def check_page(page, selection):
+    """Return ``(view, split, error)`` for every pair of ``page`` that raises under ``selection``."""
+    view_label, split_label = PAGES[page]
+    app = _open(page, selection)
+    failures = []
+    for view in _selectbox(app, view_label).options:
+        _selectbox(app, view_label).set_value(view).run()
+        for split in _selectbox(app, split_label).options:
+            _selectbox(app, split_label).set_value(split).run()
+            if app.exception:
+                failures.append((view, split, app.exception[0].value))
+                # A failed run leaves no widgets to set
+                app = _open(page, selection)
+                _selectbox(app, view_label).set_value(view).run()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=list(PAGES), help="page scripts to check")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    failed = 0
+    for page in args.pages:
+        for selection in SELECTIONS:
+            failures = check_page(page, selection)
+            failed += len(failures)
+            for view, split, error in failures:
+                print(f"{page} {selection or 'unfiltered'}: {view} split by {split} failed: {error}")
+            print(f"{page} {selection or 'unfiltered'}: {len(failures)} failed pairs")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Scale the datasets in ``data/`` up to synthetic ones of any size.
+
+A dataset scaled by N holds N copies of every CSV. In every copy but the
+first, the number of an identifier is shifted past the largest one of its
+prefix, keeping the prefix and the zero padding: with 107793 the largest
+student number, ``Student02739`` is ``Student110532`` in the second copy.
+The shift is the same in every file, and the plain ``Staff_Id`` numbers of
+the HR file move with the ``Staff`` ids of the library, so joins such as
+books to checkouts or students to placements still line up. Dates move forward by the span of years the original file covers, so each
+copy reads as further years of history.
+
+    python -m benchmarks.synthetic 10 benchmarks/.data/x10
+"""
+import argparse
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from dashboard import schema
+
+SOURCE_DIR = "data"
+
+# Identifier columns that have to stay unique and keep matching across files
+ID_COLUMNS = {
+    "hr_analytics": ["Staff_Id"],
+    "library_dimension": ["S.No", "Book Id"],
+    "library_fact": [" ID", "Book ID"],
+    "library_members": ["Member_ID"],
+    "final_student_data": ["Enrollment Id"],
+    "campus": ["Enrollement ID"],
+}
+
+# Integer id columns numbering the entities of a prefix used in other files
+ID_PREFIXES = {"Staff_Id": "Staff"}
+
+_ID = re.compile(r"^(?P<prefix>\D*)(?P<number>\d+)$")
+
+
+def _date_columns(name):
+    return [column for column, kind in schema.SCHEMAS[name].items() if kind == "datetime"]
+
+
+def _split_ids(column, values):
+    """Return the prefix, the digits and the shift key of every id in ``values``, NaN where it has no digits."""
+    parts = values.str.extract(_ID)
+    # A plain number is shifted with the prefix it stands for, or on its own
+    keys = parts["prefix"].replace("", ID_PREFIXES.get(column, column))
+    return parts["prefix"], parts["number"], keys
+
+
+def id_offsets(source_dir=SOURCE_DIR):
+    """Return the largest id number of every prefix over all the files."""
+    offsets = {}
+    for name, columns in ID_COLUMNS.items():
+        df = pd.read_csv(os.path.join(source_dir, f"{name}.csv"), usecols=columns, dtype=str, keep_default_na=False)
+        for column in columns:
+            _, digits, keys = _split_ids(column, df[column])
+            for key, number in pd.to_numeric(digits).groupby(keys).max().items():
+                offsets[key] = max(offsets.get(key, 0), int(number))
+    return offsets
+
+
+def _copy(df, name, copy, year_span, id_offsets):
+    df = df.copy()
+    for column in ID_COLUMNS.get(name, []):
+        prefixes, digits, keys = _split_ids(column, df[column])
+        shifted = pd.to_numeric(digits) + copy * keys.map(id_offsets)
+        # Padded to the width of the original digits, so Staff007 stays Staff + three digits
+        numbers = [str(int(number)).zfill(len(text)) if text == text else "" for number, text in zip(shifted, digits)]
+        df[column] = (prefixes + pd.Series(numbers, index=df.index)).where(digits.notna(), df[column])
+    for column in _date_columns(name):
+        dates = pd.to_datetime(df[column], errors="coerce")
+        shifted = (dates + pd.DateOffset(years=copy * year_span)).dt.strftime("%Y-%m-%d")
+        df[column] = shifted.where(dates.notna(), df[column])
+    return df
+
+
+def scale_dataset(name, scale, out_dir, id_offsets):
+    """Write ``scale`` copies of ``data/<name>.csv`` to ``out_dir``, shifting ids by ``id_offsets``."""
+    # Read everything as text so unchanged values are written back verbatim
+    df = pd.read_csv(os.path.join(SOURCE_DIR, f"{name}.csv"), dtype=str, keep_default_na=False)
+    # Every date column of a file moves by the same number of years
+    year_span = 0
+    if _date_columns(name):
+        dates = pd.concat([pd.to_datetime(df[column], errors="coerce") for column in _date_columns(name)])
+        year_span = int(dates.max().year - dates.min().year + 1)
+    path = os.path.join(out_dir, f"{name}.csv")
+    # One copy at a time, so memory stays flat however large the scale
+    for copy in range(scale):
+        rows = df if copy == 0 else _copy(df, name, copy, year_span, id_offsets)
+        rows.to_csv(path, mode="w" if copy == 0 else "a", header=copy == 0, index=False)
+
+
+def generate(scale, out_dir):
+    """Write every dataset scaled by ``scale`` to ``out_dir``."""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    # The same shift in every file, so the ids of a copy match across files
+    offsets = id_offsets()
+    for name in schema.SCHEMAS:
+        scale_dataset(name, scale, out_dir, offsets)
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scale", type=int, help="number of copies of every dataset")
+    parser.add_argument("out_dir", help="directory to write the scaled CSV files to")
+    args = parser.parse_args()
+    generate(args.scale, args.out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Bounded, TTL-aware caching for the dashboard loaders.
+
+Loaders are cached with ``st.cache_resource`` so a hit neither pickles nor
+hashes the returned frames. Callers always receive shallow copies and
+pandas copy-on-write is enabled, which keeps the cached frames immutable
+without copying their data: adding or overwriting a column on a returned
+frame only touches that caller's copy.
+"""
+import functools
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+
+from dashboard.spans import span
+
+pd.set_option("mode.copy_on_write", True)
+
+DEFAULT_TTL = 60 * 60
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+@dataclass
+class CacheStats:
+    name: str
+    ttl: float
+    max_entries: int
+    calls: int = 0
+    misses: int = 0
+    total_seconds: float = 0.0
+    load_seconds: float = 0.0
+
+    @property
+    def hits(self):
+        return self.calls - self.misses
+
+    @property
+    def mean_ms(self):
+        return 1000 * self.total_seconds / self.calls if self.calls else 0.0
+
+
+def cache_stats():
+    """Return the counters of every cached function, sorted by name."""
+    with _stats_lock:
+        return [_stats[name] for name in sorted(_stats)]
+
+
+def _stats_for(func, ttl, max_entries):
+    page = os.path.splitext(os.path.basename(func.__code__.co_filename))[0]
+    name = f"{page}.{func.__qualname__}"
+    with _stats_lock:
+        # Page scripts are re-executed on every rerun, so the counters are
+        # keyed by name and outlive the decorated function objects.
+        if name not in _stats:
+            _stats[name] = CacheStats(name, ttl, max_entries)
+        return _stats[name]
+
+
+def _view(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_view(item) for item in value)
+    if isinstance(value, list):
+        return [_view(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _view(item) for key, item in value.items()}
+    return value
+
+
+def cached(ttl=DEFAULT_TTL, max_entries=8):
+    """Cache a loader for ``ttl`` seconds, keeping at most ``max_entries`` results."""
+    def decorator(func):
+        stats = _stats_for(func, ttl, max_entries)
+
+        def load(*args, **kwargs):
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            with _stats_lock:
+                stats.misses += 1
+                stats.load_seconds += time.perf_counter() - start
+            return value
+
+        # Streamlit keys its cache on the module, name and source of the
+        # function, so the loader must look like the decorated function.
+        functools.update_wrapper(load, func)
+        load = st.cache_resource(ttl=ttl, max_entries=max_entries, show_spinner=False)(load)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            with span(f"cache:{stats.name}"):
+                value = _view(load(*args, **kwargs))
+            with _stats_lock:
+                stats.calls += 1
+                stats.total_seconds += time.perf_counter() - start
+            return value
+
+        wrapper.clear = load.clear
+        return wrapper
+    return decorator
@@ -0,0 +1,216 @@
+"""Ranked full-text and fuzzy search over the library catalogue.
+
+The titles, authors and publishers of ``library_dimension.csv`` are split
+into lowercase words, each with a posting list of the books it appears in.
+Every word is also indexed by the trigrams of its folded spelling, so a
+misspelt or differently transliterated query word (``Sreenivasan`` for
+``Srinivasan``) still finds it. The last query word also matches as a
+prefix, since the page searches as the user types. Books are ranked by the
+sum over the query words of their best match, weighted by the field it is
+in and by how rare the query word is.
+
+The postings are saved next to the snapshots. When books were only added
+to the catalogue since, only the new books are tokenized.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dashboard import store
+
+INDEX_PATH = os.path.join(store.SNAPSHOT_DIR, "catalogue_index.arrow")
+# Changed whenever the tokenizer or the saved postings change meaning
+INDEX_FORMAT = "1"
+
+# The searched fields and the weight of a word found in each
+FIELDS = {"Title": 1.0, "Author": 1.0, "Publisher": 0.5}
+
+WORD = r"[a-z0-9]+"
+
+# Spelling variants of transliterated Indian names are folded together before
+# the trigrams are taken: Lakshmi/Laxmi, Sreenivasan/Srinivasan,
+# Murthy/Moorthy/Murty, Vishwanathan/Viswanathan, Pillai/Pilai
+FOLDS = [
+    (r"ksh", "x"),
+    (r"([bdgjkpst])h", r"\1"),
+    (r"ee", "i"),
+    (r"oo", "u"),
+    (r"w", "v"),
+    (r"y$", "i"),
+    (r"(.)\1+", r"\1"),
+]
+_FOLDS = [(re.compile(pattern), replacement) for pattern, replacement in FOLDS]
+
+# Fraction of trigrams a word must share with a query word to match it
+MIN_SIMILARITY = 0.4
+# Similarity of a fuzzy or prefix match relative to an exact one
+FUZZY_WEIGHT = 0.9
+PREFIX_WEIGHT = 0.8
+MAX_PREFIX_WORDS = 50
+
+
+def _normalize(texts):
+    # Lowercase ASCII, with the accents of transliterated names dropped
+    return texts.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower()
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return re.findall(WORD, text)
+
+
+def _fold(word):
+    for pattern, replacement in _FOLDS:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def _trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _postings(books):
+    """Return the ``(term, doc, weight)`` postings of ``books``, a doc being a row position."""
+    frames = []
+    for field, weight in FIELDS.items():
+        words = _normalize(books[field].astype("string").fillna("")).str.findall(WORD).explode().dropna()
+        frames.append(pd.DataFrame({"term": words.to_numpy(dtype=object), "doc": words.index.to_numpy(), "weight": weight}))
+    postings = pd.concat(frames, ignore_index=True)
+    # A word in several fields of a book counts once, for its heaviest field
+    postings = postings.groupby(["term", "doc"], sort=False)["weight"].max().reset_index()
+    return postings.astype({"doc": "int32", "weight": "float32"})
+
+
+def _digest(books):
+    hashes = pd.util.hash_pandas_object(books, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+
+def _csr(codes, size):
+    # Positions grouped by code and the offsets of each code's group in them
+    order = np.argsort(codes, kind="stable")
+    return order, np.searchsorted(codes[order], np.arange(size + 1))
+
+
+class CatalogueIndex:
+    """Word postings and word trigrams over the books of the catalogue."""
+
+    def __init__(self, postings, size):
+        self.size = size
+        codes, terms = pd.factorize(postings["term"], sort=True)
+        order, self._offsets = _csr(codes, len(terms))
+        self._docs = postings["doc"].to_numpy()[order]
+        self._weights = postings["weight"].to_numpy()[order]
+        # The sorted vocabulary, searched for prefixes
+        self.terms = np.asarray(terms, dtype=object)
+        self._term_ids = {term: position for position, term in enumerate(self.terms)}
+        # Rare words rank a book higher than words most titles have
+        self._idf = np.log1p(size / np.maximum(np.diff(self._offsets), 1))
+
+        folded = pd.Series(self.terms, dtype=object)
+        for pattern, replacement in FOLDS:
+            folded = folded.str.replace(pattern, replacement, regex=True)
+        padded = "  " + folded + " "
+        grams = pd.concat(
+            [pd.DataFrame({"gram": padded.str[i:i + 3], "term": np.arange(len(padded))}) for i in range(padded.str.len().max() - 2)],
+            ignore_index=True,
+        )
+        grams = grams[grams["gram"].str.len() == 3].drop_duplicates()
+        gram_codes, gram_names = pd.factorize(grams["gram"])
+        order, self._gram_offsets = _csr(gram_codes, len(gram_names))
+        self._gram_terms = grams["term"].to_numpy()[order]
+        self._gram_ids = {gram: position for position, gram in enumerate(gram_names)}
+        self._gram_counts = np.bincount(grams["term"], minlength=len(self.terms))
+
+    def _matches(self, word, prefix):
+        """Return ``{term: similarity}`` of the words matching the query ``word``."""
+        matches = {}
+        grams = _trigrams(_fold(word))
+        ids = [self._gram_ids[gram] for gram in grams if gram in self._gram_ids]
+        if ids:
+            candidates = np.concatenate([self._gram_terms[self._gram_offsets[i]:self._gram_offsets[i + 1]] for i in ids])
+            terms, shared = np.unique(candidates, return_counts=True)
+            similarity = shared / (len(grams) + self._gram_counts[terms] - shared)
+            keep = similarity >= MIN_SIMILARITY
+            matches = dict(zip(terms[keep].tolist(), (FUZZY_WEIGHT * similarity[keep]).tolist()))
+        if prefix and len(word) > 1:
+            start, end = np.searchsorted(self.terms, [word, word + "\x7f"])
+            for term in range(start, min(end, start + MAX_PREFIX_WORDS)):
+                matches[term] = max(matches.get(term, 0.0), PREFIX_WEIGHT)
+        exact = self._term_ids.get(word)
+        if exact is not None:
+            matches[exact] = 1.0
+        return matches
+
+    def search(self, text, k=20, popularity=None):
+        """Return the positions and scores of the ``k`` books best matching ``text``.
+
+        Books that score the same are ordered by ``popularity``, an array
+        with one value per book, when given.
+        """
+        words = _words(text)
+        scores = np.zeros(self.size)
+        for position, word in enumerate(words):
+            matches = self._matches(word, prefix=position == len(words) - 1)
+            if not matches:
+                continue
+            # A query word is as rare as its closest match, so a rare misspelling
+            # or a longer word it prefixes does not outrank the word itself
+            idf = self._idf[max(matches, key=matches.get)]
+            best = np.zeros(self.size)
+            for term, similarity in matches.items():
+                docs = self._docs[self._offsets[term]:self._offsets[term + 1]]
+                weights = self._weights[self._offsets[term]:self._offsets[term + 1]]
+                best[docs] = np.maximum(best[docs], similarity * idf * weights)
+            scores += best
+        found = np.flatnonzero(scores)
+        keys = [-scores[found]] if popularity is None else [-popularity[found], -scores[found]]
+        top = found[np.lexsort(keys)[:k]]
+        return top, scores[top]
+
+
+def _save(postings, books):
+    table = pa.Table.from_pandas(postings, preserve_index=False).replace_schema_metadata({
+        "format": INDEX_FORMAT,
+        "books": str(len(books)),
+        "sha256": _digest(books),
+    })
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    os.makedirs(store.SNAPSHOT_DIR, exist_ok=True)
+    store.write_atomic(INDEX_PATH, write)
+
+
+def _load_saved(books):
+    """Return the saved postings and the number of books they cover, if they cover a prefix of ``books``."""
+    try:
+        table = pa.ipc.open_file(pa.memory_map(INDEX_PATH, "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None, 0
+    metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+    covered = int(metadata.get("books", -1))
+    if (metadata.get("format") != INDEX_FORMAT or not 0 <= covered <= len(books)
+            or metadata.get("sha256") != _digest(books.iloc[:covered])):
+        return None, 0
+    return table.to_pandas(), covered
+
+
+def load_index(lib_dim):
+    """Return the index of the ``lib_dim`` catalogue, only tokenizing the books the saved one lacks."""
+    books = lib_dim[["Book Id", *FIELDS]].reset_index(drop=True)
+    postings, covered = _load_saved(books)
+    if postings is None or covered < len(books):
+        added = _postings(books.iloc[covered:])
+        postings = added if postings is None else pd.concat([postings, added], ignore_index=True)
+        _save(postings, books)
+    return CatalogueIndex(postings, len(books))
@@ -0,0 +1,43 @@
+"""Pre-aggregated group-by counts for the categorical chart selectors.
+
+A cube holds the row count for every value of each dimension and for every
+pair of dimensions, so a selectbox change only looks up a few hundred
+bytes of counts instead of sending the raw rows to ``px.histogram``.
+"""
+import itertools
+
+import pandas as pd
+
+COUNT = "Count"
+
+
+def plain_values(counts, dimensions):
+    """Return ``counts`` with its categorical ``dimensions`` as plain values.
+
+    A categorical column keeps every category of the table, including those
+    without a count, and Plotly fails to colour by a category with no rows.
+    """
+    categorical = [dimension for dimension in dimensions if isinstance(counts[dimension].dtype, pd.CategoricalDtype)]
+    return counts.astype(dict.fromkeys(categorical, object)) if categorical else counts
+
+
+def _count(df, dimensions):
+    return plain_values(df.groupby(dimensions, observed=True).size().reset_index(name=COUNT), dimensions)
+
+
+def build_cube(df, dimensions):
+    """Count ``df`` rows per dimension and per pair of dimensions."""
+    cube = {}
+    for dimension in dimensions:
+        counts = _count(df, [dimension])
+        cube[(dimension,)] = counts.sort_values(COUNT, ascending=False, kind="stable").reset_index(drop=True)
+    for pair in itertools.combinations(dimensions, 2):
+        cube[pair] = _count(df, list(pair))
+    return cube
+
+
+def cube_counts(cube, *dimensions):
+    """Return the counts for one dimension or a pair of dimensions."""
+    if dimensions in cube:
+        return cube[dimensions]
+    return cube[dimensions[::-1]]
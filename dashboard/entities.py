@@ -0,0 +1,102 @@
+"""One index of every student and staff member across the datasets.
+
+The same person is ``Student02739`` in the student, placement and library
+tables and a staff member is ``7`` in ``hr_analytics.csv`` but ``Staff007``
+in the library ones. Every ID is normalized to a ``(kind, number)`` pair and
+given a dense integer surrogate key. For each table the row positions are
+grouped by key into one sorted array with an offset array into it, so all
+the rows of a person are two array slices away from a dict lookup.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# The column holding the student or staff ID in each dataset
+ID_COLUMNS = {
+    "hr_analytics": "Staff_Id",
+    "final_student_data": "Enrollment Id",
+    "campus": "Enrollement ID",
+    "library_members": "Member_ID",
+    "library_fact": " ID",
+}
+
+# Canonical spelling of each kind of ID
+ID_FORMATS = {"student": "Student{:05d}", "staff": "Staff{:03d}"}
+
+_ID_PATTERN = r"^\s*(?P<kind>student|staff)\s*(?P<number>\d+)\s*$"
+_ID_REGEX = re.compile(_ID_PATTERN, re.IGNORECASE)
+_KIND_CODES = {"student": 0, "staff": 1}
+
+
+def _pack(kinds, numbers):
+    # One integer per (kind, number) pair, -1 where the ID was not understood
+    packed = numbers * 2 + kinds
+    return np.where((numbers >= 0) & (kinds >= 0), packed, -1)
+
+
+def _parse_ids(values):
+    """Normalize a Series of IDs into packed ``(kind, number)`` integers."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Parse every distinct ID once
+        parsed = _parse_ids(pd.Series(values.cat.categories))
+        return np.where(values.cat.codes.to_numpy() >= 0, parsed[values.cat.codes.to_numpy()], -1)
+    if pd.api.types.is_integer_dtype(values.dtype):
+        # hr_analytics.csv numbers its staff without a prefix
+        numbers = values.to_numpy(dtype="int64")
+        return _pack(np.full(len(numbers), _KIND_CODES["staff"]), numbers)
+    parts = values.astype("string").str.extract(_ID_REGEX)
+    kinds = parts["kind"].str.lower().map(_KIND_CODES).fillna(-1).to_numpy(dtype="int64")
+    numbers = pd.to_numeric(parts["number"], errors="coerce").fillna(-1).to_numpy(dtype="int64")
+    return _pack(kinds, numbers)
+
+
+def parse_id(text):
+    """Return the ``(kind, number)`` of an ID typed by a user, or None."""
+    match = _ID_REGEX.match(text)
+    if match is None:
+        return None
+    return match["kind"].lower(), int(match["number"])
+
+
+def format_id(kind, number):
+    return ID_FORMATS[kind].format(number)
+
+
+class EntityIndex:
+    """Row positions of every student and staff member in each table."""
+
+    def __init__(self, tables):
+        packed = {name: _parse_ids(frame[ID_COLUMNS[name]]) for name, frame in tables.items()}
+        everyone = np.unique(np.concatenate(list(packed.values())))
+        everyone = everyone[everyone >= 0]
+        # Surrogate keys are positions in the sorted packed IDs
+        self._keys = {(("staff" if value % 2 else "student"), int(value // 2)): key for key, value in enumerate(everyone)}
+        self._tables = {}
+        for name, frame in tables.items():
+            keys = np.searchsorted(everyone, packed[name])
+            keys[packed[name] < 0] = -1
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            # offsets[key]:offsets[key + 1] are the positions in order of that entity's rows
+            offsets = np.searchsorted(sorted_keys, np.arange(len(everyone) + 1))
+            self._tables[name] = (frame, order, offsets)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def counts(self):
+        """Return the number of students and staff members indexed."""
+        kinds = pd.Series([kind for kind, _ in self._keys])
+        return kinds.value_counts().to_dict()
+
+    def lookup(self, text):
+        """Return the canonical ID and the rows of every table for an ID, or None."""
+        parsed = parse_id(text)
+        key = None if parsed is None else self._keys.get(parsed)
+        if key is None:
+            return None
+        records = {}
+        for name, (frame, order, offsets) in self._tables.items():
+            records[name] = frame.iloc[order[offsets[key]:offsets[key + 1]]].reset_index(drop=True)
+        return {"id": format_id(*parsed), "kind": parsed[0], "records": records}
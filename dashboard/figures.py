@@ -0,0 +1,132 @@
+"""Building and showing Plotly figures with a bounded payload.
+
+Figures are always built from pre-aggregated data, never from raw rows.
+Line traces switch to WebGL (``Scattergl``) above ``SCATTERGL_MIN_POINTS``
+and long series are downsampled with Largest-Triangle-Three-Buckets to
+``MAX_LINE_POINTS``. ``show`` holds every figure to ``MAX_FIGURE_BYTES``
+of JSON, downsampling its point traces further when it is above, and
+logs the figures that still are. A figure is measured the first time it
+is shown and the size is kept on it, so a cached figure shown on every
+rerun is only serialized by Streamlit.
+"""
+import logging
+import threading
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io
+import streamlit as st
+
+from dashboard.spans import span
+
+MAX_FIGURE_BYTES = 64 * 1024
+SCATTERGL_MIN_POINTS = 500
+MAX_LINE_POINTS = 800
+# Traces shorter than this are left whole, whatever the budget
+MIN_FIT_POINTS = 50
+# The per-point arrays cut along with x and y
+POINT_ARRAYS = ("x", "y", "text", "hovertext", "customdata")
+
+logger = logging.getLogger(__name__)
+
+# Figures are measured and fitted one at a time, since a cached figure is
+# shared by every session showing it
+_fit_lock = threading.Lock()
+
+
+def figure_bytes(fig):
+    """Return the size of the JSON sent to the browser for ``fig``."""
+    return len(plotly.io.to_json(fig, validate=False))
+
+
+def _positions(x):
+    # Numeric positions of the x values for LTTB; labels are spaced evenly
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype("int64")
+    if np.issubdtype(x.dtype, np.number):
+        return x
+    return np.arange(len(x))
+
+
+def fit(fig):
+    """Downsample the point traces of ``fig`` until its JSON fits ``MAX_FIGURE_BYTES``; return its size."""
+    size = figure_bytes(fig)
+    while size > MAX_FIGURE_BYTES:
+        traces = [trace for trace in fig.data if trace.type in ("scatter", "scattergl") and trace.y is not None and len(trace.y) > MIN_FIT_POINTS]
+        if not traces:
+            break
+        # The points are cut in proportion to the excess, with some room for the layout
+        fraction = 0.9 * MAX_FIGURE_BYTES / size
+        for trace in traces:
+            y = np.asarray(trace.y)
+            x = np.arange(len(y)) if trace.x is None else np.asarray(trace.x)
+            kept = lttb(_positions(x), y, max(MIN_FIT_POINTS, int(len(y) * fraction)))
+            trace.update({name: np.asarray(trace[name])[kept] for name in POINT_ARRAYS
+                          if trace[name] is not None and np.ndim(trace[name]) == 1 and len(trace[name]) == len(y)})
+        size = figure_bytes(fig)
+    return size
+
+
+def show(fig):
+    """Render ``fig`` across the page width, within the payload budget when it can be."""
+    title = fig.layout.title.text or "untitled"
+    with span(f"figure:{title}") as record:
+        with _fit_lock:
+            size = getattr(fig, "_payload_bytes", None)
+            if size is None:
+                size = fig._payload_bytes = fit(fig)
+                if size > MAX_FIGURE_BYTES:
+                    logger.warning("Figure %r is %d bytes, above the %d byte budget", title, size, MAX_FIGURE_BYTES)
+        record.payload_bytes = size
+        st.plotly_chart(fig, use_container_width=True)
+
+
+def count_bars(counts, **kwargs):
+    """Bar chart of a ``value_counts``-style Series: one bar per index value."""
+    return px.bar(x=counts.index.astype(str), y=counts.values, **kwargs)
+
+
+def lttb(x, y, threshold):
+    """Return the indices of ``threshold`` points of (x, y) chosen by LTTB.
+
+    Largest-Triangle-Three-Buckets keeps the first and last points and, for
+    each bucket in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket, which
+    preserves the visual shape of the series.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, threshold - 1).astype("int64")
+    kept = [0]
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        previous = kept[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        kept.append(start + int(areas.argmax()))
+    kept.append(n - 1)
+    return np.asarray(kept)
+
+
+def line_trace(x, y, **kwargs):
+    """Return a line trace for a time series, downsampled and WebGL when long.
+
+    ``x`` may hold numbers, datetimes or labels; labels are spaced evenly.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) > MAX_LINE_POINTS:
+        kept = lttb(_positions(x), y, MAX_LINE_POINTS)
+        x, y = x[kept], y[kept]
+        kwargs = {key: (np.asarray(value)[kept] if key == "text" else value) for key, value in kwargs.items()}
+    trace = go.Scattergl if len(y) > SCATTERGL_MIN_POINTS else go.Scatter
+    return trace(x=x, y=y, **kwargs)
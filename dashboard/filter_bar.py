@@ -0,0 +1,58 @@
+"""The global filter bar and data version shown in the sidebar of every page."""
+import os
+
+import streamlit as st
+
+from dashboard.filters import COLUMNS, FILTERS, LABELS, selection_of
+from dashboard.service import fetch
+
+# The diagnostics page is only offered when the dashboard is started with DASHBOARD_DIAGNOSTICS=1
+DIAGNOSTICS = os.environ.get("DASHBOARD_DIAGNOSTICS") == "1"
+
+# Streamlit links every script of pages/ in the sidebar, so the link is hidden instead
+_HIDE_DIAGNOSTICS = '<style>[data-testid="stSidebarNav"] li:has(a[href$="/Diagnostics"]) { display: none; }</style>'
+
+
+def _remember(key):
+    # Widget state is dropped when the user switches pages, so the chosen
+    # value is also kept under a key no widget owns
+    st.session_state[key] = st.session_state[f"{key}_widget"]
+
+
+def filter_bar(datasets):
+    """Render the global filters and return the selection.
+
+    ``datasets`` are the datasets the page shows; the filters none of them
+    can be filtered by are listed as not applying to the page.
+    """
+    options = fetch("filter_options")
+    st.sidebar.header("Filters")
+    values = {}
+    for name in FILTERS:
+        key = f"filter_{name}"
+        choices = [None] + options[name]
+        current = st.session_state.get(key)
+        values[name] = st.sidebar.selectbox(
+            LABELS[name], choices, index=choices.index(current) if current in choices else 0,
+            format_func=lambda value: "All" if value is None else str(value),
+            key=f"{key}_widget", on_change=_remember, args=(key,),
+        )
+    hide_diagnostics_link()
+    selection = selection_of(**values)
+    ignored = [LABELS[name] for name, _ in selection if not any(name in COLUMNS.get(dataset, {}) for dataset in datasets)]
+    if ignored:
+        st.sidebar.caption(f"Not applied on this page: {', '.join(ignored)}")
+    show_data_version()
+    return selection
+
+
+def hide_diagnostics_link():
+    """Hide the diagnostics page from the sidebar navigation unless it is enabled."""
+    if not DIAGNOSTICS:
+        st.sidebar.markdown(_HIDE_DIAGNOSTICS, unsafe_allow_html=True)
+
+
+def show_data_version():
+    """Show the version of the data the page is drawn from in the sidebar."""
+    generation = fetch("data_generation")
+    st.sidebar.caption(f"Data version {generation['version']}, loaded {generation['built_at']:%d %b %Y %H:%M:%S}")
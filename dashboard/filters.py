@@ -0,0 +1,101 @@
+"""The global filters shared by every page and their pushdown to the snapshots.
+
+A selection is a tuple of ``(filter, value)`` pairs, for instance
+``(("year", 2018), ("department", "Tamil"))``, so it can key caches as is.
+``scan`` turns it into a pyarrow expression over the columns of one dataset
+and reads only the matching rows and requested columns of its Arrow
+snapshot. Filters a dataset has no column for are ignored for it.
+"""
+import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from dashboard import store
+
+FILTERS = ("year", "department", "stream", "graduation_type")
+
+LABELS = {
+    "year": "Academic Year",
+    "department": "Department",
+    "stream": "Stream",
+    "graduation_type": "Graduation Type",
+}
+
+# The column of each dataset that answers each filter
+COLUMNS = {
+    "hr_analytics": {"year": "Joining_Date", "department": "Department", "stream": "Stream"},
+    "library_fact": {"year": "Date"},
+    "library_footfall_data": {"year": "Date"},
+    "final_student_data": {"year": "Entry Date", "department": "Department", "stream": "Stream Type", "graduation_type": "Graduation Type"},
+    "student_enrollment": {"year": "Year", "department": "Department", "stream": "Stream Type", "graduation_type": "Graduation Type"},
+    "campus": {"year": "Year", "department": "Department", "graduation_type": "Graduation Type"},
+}
+
+# Staff are counted in every year from the one they joined in
+CUMULATIVE_YEAR = {"hr_analytics"}
+
+# The staff and student tables spell the two streams differently
+STREAMS = {
+    "Aided": {"Stream": "Aided Stream ", "Stream Type": "Aided"},
+    "Self Finance": {"Stream": "Self Finance Stream ", "Stream Type": "SFS"},
+}
+
+
+def selection_of(**values):
+    """Return the selection for the filters given a value other than None."""
+    return tuple((name, values[name]) for name in FILTERS if values.get(name) is not None)
+
+
+def applied(name, selection):
+    """Return the part of ``selection`` that dataset ``name`` can be filtered by."""
+    return tuple((key, value) for key, value in selection if key in COLUMNS.get(name, {}))
+
+
+def column_values(name, selection):
+    """Return the applicable part of ``selection`` as ``{column: value}`` in dataset ``name``'s spelling."""
+    values = {}
+    for key, value in applied(name, selection):
+        column = COLUMNS[name][key]
+        values[column] = STREAMS[value][column] if key == "stream" else value
+    return values
+
+
+def year_bounds(year):
+    """Return the first and last instants of ``year`` as timestamps."""
+    return datetime.datetime(year, 1, 1), datetime.datetime(year, 12, 31, 23, 59, 59)
+
+
+def expression(name, selection):
+    """Return the pyarrow filter expression of ``selection`` over dataset ``name``, or None."""
+    conditions = []
+    for key, value in applied(name, selection):
+        column = COLUMNS[name][key]
+        field = pc.field(column)
+        if key == "year":
+            end = pa.scalar(datetime.datetime(value + 1, 1, 1), pa.timestamp("ns"))
+            condition = field < end
+            if name not in CUMULATIVE_YEAR:
+                condition = condition & (field >= pa.scalar(datetime.datetime(value, 1, 1), pa.timestamp("ns")))
+        elif key == "stream":
+            condition = field == STREAMS[value][column]
+        else:
+            condition = field == value
+        conditions.append(condition)
+    if not conditions:
+        return None
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition
+    return combined
+
+
+def scan(name, selection, columns=None, table=None):
+    """Read the rows of ``name`` matching ``selection`` from its snapshot.
+
+    Only ``columns`` (all when None) are read from the memory-mapped file.
+    An Arrow ``table`` already loaded for ``name`` is scanned instead when given.
+    """
+    dataset = ds.dataset(store.ensure_snapshot(name), format="ipc") if table is None else ds.dataset(table)
+    return dataset.to_table(columns=columns, filter=expression(name, selection))
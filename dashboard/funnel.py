@@ -0,0 +1,73 @@
+"""Admissions funnel rollup over ``student_enrollment.csv``.
+
+The stage totals are summed once for every combination of the funnel
+dimensions (the 64 grouping sets of six dimensions), so any drill-down the
+admissions page offers is a dictionary lookup. A key holds one entry per
+dimension, in ``DIMENSIONS`` order, with None where that dimension is
+rolled up: ``(2018, None, "Indian", None, None, "UG")`` is every Indian UG
+applicant of 2018.
+"""
+import itertools
+
+import pandas as pd
+
+DIMENSIONS = ["Year", "Department", "Nationality", "Stream Type", "Caste", "Graduation Type"]
+STAGES = ["Applied Students", "Selected Students", "Enrolled Students"]
+
+
+def build_rollup(enrollment):
+    """Sum the funnel stages for every combination of ``DIMENSIONS``.
+
+    Returns ``(rollup, values)``: the stage totals by key and the sorted
+    values of each dimension.
+    """
+    # Intakes are recorded on the first day of their year
+    keys = enrollment[DIMENSIONS].assign(Year=enrollment["Year"].dt.year)
+    keys = keys.astype({column: "object" for column in DIMENSIONS if column != "Year"})
+    stages = enrollment[STAGES].astype("int64")
+    rollup = {}
+    for size in range(len(DIMENSIONS) + 1):
+        for grouping in itertools.combinations(DIMENSIONS, size):
+            if grouping:
+                totals = stages.groupby([keys[column] for column in grouping]).sum()
+                groups = totals.index if size > 1 else ((value,) for value in totals.index)
+                rows = zip(groups, totals.itertuples(index=False, name=None))
+            else:
+                rows = [((), tuple(int(total) for total in stages.sum()))]
+            for group, row in rows:
+                named = dict(zip(grouping, group))
+                rollup[tuple(named.get(column) for column in DIMENSIONS)] = row
+    values = {column: sorted(keys[column].dropna().unique().tolist()) for column in DIMENSIONS}
+    return rollup, values
+
+
+def rollup_key(fixed):
+    """Return the rollup key holding the ``fixed`` dimension values."""
+    fixed = dict(fixed)
+    return tuple(fixed.get(column) for column in DIMENSIONS)
+
+
+def _rates(frame):
+    # The intake records hold more enrolled than selected students, so both
+    # rates are taken against the applications rather than stage to stage
+    applied = frame["Applied Students"].where(frame["Applied Students"] > 0)
+    return frame.assign(**{
+        "Selection Rate (%)": (100 * frame["Selected Students"] / applied).round(2),
+        "Enrollment Rate (%)": (100 * frame["Enrolled Students"] / applied).round(2),
+    })
+
+
+def funnel_totals(rollup, fixed):
+    """Return the stage totals with the ``fixed`` dimension values, all zero when none match."""
+    return pd.Series(rollup.get(rollup_key(fixed), (0,) * len(STAGES)), index=STAGES)
+
+
+def funnel_breakdown(rollup, values, fixed, by):
+    """Return the stage totals and rates for every value of ``by`` with ``fixed`` held."""
+    fixed = dict(fixed)
+    rows = []
+    for value in values[by]:
+        totals = rollup.get(rollup_key({**fixed, by: value}))
+        if totals is not None:
+            rows.append((value, *totals))
+    return _rates(pd.DataFrame(rows, columns=[by, *STAGES]))
@@ -0,0 +1,61 @@
+"""Summary statistics and top/bottom tables for the HR page."""
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Placeholder values used in hr_analytics.csv for unknown figures
+EXPERIENCE_SENTINEL = 9999
+SALARY_SENTINEL = 999999999
+
+TABLE_COLUMNS = ['Staff_Id', 'Name', 'Age', 'Salary', 'Department', 'Designation', 'Qualification', 'Experience']
+
+
+@dataclass(frozen=True)
+class HRMetrics:
+    total_staff: int
+    mean_age: float
+    min_age: int
+    mean_experience: float
+    max_experience: float
+    min_experience: float
+    mean_salary: float
+    max_salary: int
+    min_salary: int
+    top_experience: pd.DataFrame
+    bottom_experience: pd.DataFrame
+    top_salary: pd.DataFrame
+    bottom_salary: pd.DataFrame
+
+
+def clean_hr_data(hran):
+    """Replace the Experience and Salary sentinels with nulls."""
+    return hran.assign(
+        Experience=hran['Experience'].mask(hran['Experience'] == EXPERIENCE_SENTINEL),
+        Salary=hran['Salary'].mask(hran['Salary'] == SALARY_SENTINEL).astype('Int64'),
+    )
+
+
+def _table(rows):
+    return rows[TABLE_COLUMNS].reset_index(drop=True)
+
+
+def compute_hr_metrics(hran, n=10):
+    """Compute every HR summary figure from a frame cleaned by ``clean_hr_data``."""
+    # One aggregation over the numeric columns; nulls are skipped
+    stats = hran.agg({'Age': ['mean', 'min'], 'Experience': ['mean', 'max', 'min'], 'Salary': ['mean', 'max', 'min']})
+    return HRMetrics(
+        total_staff=hran['Staff_Id'].nunique(),
+        mean_age=stats.at['mean', 'Age'],
+        min_age=int(stats.at['min', 'Age']),
+        mean_experience=stats.at['mean', 'Experience'],
+        max_experience=stats.at['max', 'Experience'],
+        min_experience=stats.at['min', 'Experience'],
+        mean_salary=stats.at['mean', 'Salary'],
+        max_salary=int(stats.at['max', 'Salary']),
+        min_salary=int(stats.at['min', 'Salary']),
+        # nlargest/nsmallest select the rows without sorting the whole frame
+        top_experience=_table(hran.nlargest(n, 'Experience')),
+        bottom_experience=_table(hran.nsmallest(n, 'Experience')),
+        top_salary=_table(hran.nlargest(n, 'Salary')),
+        bottom_salary=_table(hran.nsmallest(n, 'Salary')),
+    )
@@ -0,0 +1,253 @@
+"""Incremental ingestion of the append-only library logs.
+
+``library_fact.csv`` (circulation) and ``library_footfall_data.csv`` (gate
+counts) only ever grow. Instead of re-reading them on every refresh, each
+log remembers the byte offset it has parsed up to and only parses the rows
+appended after it. The running per-book checkout counts and daily and
+monthly footfall totals are updated from those new rows alone, and the
+rows are written into spare room at the end of the ones already held
+rather than concatenated with them.
+"""
+import io
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dashboard import store
+
+FOOTFALL_COLUMNS = ['Footfall_Count', 'Conversion_Count']
+
+
+def _align(rows, dtypes):
+    # Give freshly parsed rows the dtypes of the rows already loaded
+    for column, dtype in dtypes.items():
+        categorical = isinstance(dtype, pd.CategoricalDtype)
+        target = dtype.categories.dtype if categorical else dtype
+        if rows[column].dtype != target:
+            try:
+                rows[column] = rows[column].astype(target)
+            except (TypeError, ValueError):
+                pass
+        if categorical:
+            rows[column] = rows[column].astype("category")
+    return rows
+
+
+class _Rows:
+    """The rows of a log, in columns with spare room at the end like a list.
+
+    Appended rows are written past the rows held so far and the columns are
+    only copied when the room runs out, into twice the room, so appending
+    costs time in proportion to the rows appended. The frames ``frame``
+    returns are views of the rows held when it was called, which are never
+    written again, so they stay as they were.
+    """
+
+    def __init__(self, frame):
+        self.dtypes = frame.dtypes
+        self.length = 0
+        self._values = {}
+        # The NA masks of the nullable boolean columns
+        self._masks = {}
+        # The categories of the categorical columns, only ever added to so the codes held stay valid
+        self._categories = {}
+        for column, dtype in self.dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                self._categories[column] = pd.Index([], dtype=dtype.categories.dtype)
+                self._values[column] = np.empty(0, dtype="int32")
+            elif isinstance(dtype, pd.BooleanDtype):
+                self._values[column] = np.empty(0, dtype=bool)
+                self._masks[column] = np.empty(0, dtype=bool)
+            else:
+                self._values[column] = np.empty(0, dtype=dtype)
+        self.append(frame)
+
+    def _grow(self, size):
+        capacity = max(size, 2 * len(next(iter(self._values.values()))))
+        for buffers in (self._values, self._masks):
+            for column, buffer in buffers.items():
+                grown = np.empty(capacity, dtype=buffer.dtype)
+                grown[:self.length] = buffer[:self.length]
+                buffers[column] = grown
+
+    def append(self, rows):
+        start, end = self.length, self.length + len(rows)
+        if self._values and end > len(next(iter(self._values.values()))):
+            self._grow(end)
+        for column, values in rows.items():
+            if column in self._categories:
+                values = values.astype("category")
+                categories = self._categories[column]
+                added = values.cat.categories[~values.cat.categories.isin(categories)]
+                if len(added):
+                    categories = self._categories[column] = categories.append(added)
+                positions = categories.get_indexer(values.cat.categories)
+                codes = values.cat.codes.to_numpy()
+                self._values[column][start:end] = np.where(codes >= 0, positions[codes], -1)
+            elif column in self._masks:
+                self._values[column][start:end] = values.to_numpy(dtype=bool, na_value=False)
+                self._masks[column][start:end] = values.isna().to_numpy()
+            else:
+                self._values[column][start:end] = values.to_numpy()
+        self.length = end
+
+    def frame(self, length=None):
+        """Return the first ``length`` rows, by default every row held."""
+        length = self.length if length is None else length
+        columns = {}
+        for column in self.dtypes.index:
+            values = self._values[column][:length]
+            if column in self._categories:
+                columns[column] = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(self._categories[column]))
+            elif column in self._masks:
+                columns[column] = pd.arrays.BooleanArray(values, self._masks[column][:length])
+            else:
+                columns[column] = values
+        return pd.DataFrame(columns, copy=False)
+
+
+class AppendOnlyCSV:
+    """A CSV file in ``data/`` that rows are only ever appended to."""
+
+    def __init__(self, name):
+        self.name = name
+        self.path = store.source_path(name)
+        self.offset = 0
+        # Incremented every time the file is reloaded from scratch
+        self.generation = 0
+        self._header = b""
+        self._rows = None
+        self._frame = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Changes whenever rows are appended or the file is reloaded."""
+        return f"{self.generation}-{self.offset}"
+
+    def _reload(self):
+        frame, self.offset = store.load_prefix(self.name)
+        with open(self.path, "rb") as source:
+            self._header = source.readline()
+        self._rows = _Rows(frame)
+        self._frame = None
+        self.generation += 1
+
+    def _rewritten(self):
+        if os.path.getsize(self.path) < self.offset:
+            return True
+        with open(self.path, "rb") as source:
+            return source.readline() != self._header
+
+    def poll(self):
+        """Parse the rows appended since the last poll.
+
+        Returns ``(rows, reset)``. When the file was truncated or rewritten it
+        is reloaded, ``reset`` is True and ``rows`` holds every row.
+        """
+        with self._lock:
+            if self._rows is None or self._rewritten():
+                self._reload()
+                # The snapshot may predate rows appended since it was built
+                self._read_appended()
+                return self._combined(), True
+            return self._read_appended()
+
+    def _read_appended(self):
+        with open(self.path, "rb") as source:
+            source.seek(self.offset)
+            chunk = source.read()
+        # A writer may be half way through a line; leave it for the next poll
+        chunk = chunk[:chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return self._rows.frame(0), False
+        rows = _align(store.read_source(self.name, io.BytesIO(self._header + chunk)), self._rows.dtypes)
+        self.offset += len(chunk)
+        self._rows.append(rows)
+        self._frame = None
+        return rows, False
+
+    def _combined(self):
+        if self._frame is None:
+            self._frame = self._rows.frame()
+        return self._frame
+
+    def frame(self):
+        """Return every row parsed so far."""
+        with self._lock:
+            return self._combined()
+
+
+def count_checkouts(circulation):
+    return circulation['Book ID'].value_counts().astype("int64")
+
+
+def sum_footfall(footfall, period='M'):
+    """Total the footfall and conversion counts per day ('D') or month ('M')."""
+    periods = footfall['Date'].dt.to_period(period).rename('Month' if period == 'M' else 'Day')
+    return footfall.groupby(periods)[FOOTFALL_COLUMNS].sum()
+
+
+@dataclass(frozen=True)
+class LibrarySnapshot:
+    """The library logs and their running totals as of one refresh.
+
+    ``LibraryLog.refresh`` replaces the frames and totals it holds rather
+    than changing them, so a snapshot stays as it was taken.
+    """
+    # The version of each log, so a result derived from one is kept when only the other grows
+    circulation_version: str
+    footfall_version: str
+    circulation: pd.DataFrame
+    # Incremented whenever the circulation log was reloaded from scratch
+    circulation_generation: int
+    checkouts: pd.Series
+    daily_footfall: pd.DataFrame
+    monthly_footfall: pd.DataFrame
+
+
+class LibraryLog:
+    """Running totals over the library circulation and footfall logs."""
+
+    def __init__(self):
+        self.circulation = AppendOnlyCSV("library_fact")
+        self.footfall = AppendOnlyCSV("library_footfall_data")
+        self.checkouts = pd.Series(dtype="int64")
+        self.daily_footfall = pd.DataFrame(columns=FOOTFALL_COLUMNS, dtype="int64")
+        self.monthly_footfall = pd.DataFrame(columns=FOOTFALL_COLUMNS, dtype="int64")
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Ingest the rows appended to both logs since the last refresh."""
+        with self._lock:
+            rows, reset = self.circulation.poll()
+            if reset:
+                self.checkouts = count_checkouts(rows)
+            elif len(rows):
+                self.checkouts = self.checkouts.add(count_checkouts(rows), fill_value=0).astype("int64")
+
+            rows, reset = self.footfall.poll()
+            if reset:
+                self.daily_footfall = sum_footfall(rows, 'D')
+                self.monthly_footfall = sum_footfall(rows, 'M')
+            elif len(rows):
+                self.daily_footfall = self.daily_footfall.add(sum_footfall(rows, 'D'), fill_value=0).astype("int64")
+                self.monthly_footfall = self.monthly_footfall.add(sum_footfall(rows, 'M'), fill_value=0).astype("int64")
+        return self
+
+    def snapshot(self):
+        """Return the logs and totals ingested so far as a ``LibrarySnapshot``."""
+        with self._lock:
+            return LibrarySnapshot(
+                circulation_version=self.circulation.version,
+                footfall_version=self.footfall.version,
+                circulation=self.circulation.frame(),
+                circulation_generation=self.circulation.generation,
+                checkouts=self.checkouts,
+                daily_footfall=self.daily_footfall,
+                monthly_footfall=self.monthly_footfall,
+            )
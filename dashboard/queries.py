@@ -0,0 +1,559 @@
+"""The aggregate queries the dashboard pages ask of the data.
+
+Every query is a function of a data ``Generation`` and JSON-friendly arguments
+that returns a small result: a scalar, a DataFrame or Series of counts, or
+a dict of those. Pages never see the underlying tables; they call
+``service.fetch(<query name>, *args)``, which runs the query in the data
+service or, when no service is running, in the page's own process.
+
+Queries that honour the global filters take a ``selection`` (see
+``filters.py``) as their last argument. Their results are cached per data
+version and selection.
+"""
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+
+from dashboard import filters, schema, store
+from dashboard.catalogue import load_index
+from dashboard.cube import COUNT, build_cube, cube_counts as _cube_counts, plain_values
+from dashboard.entities import EntityIndex
+from dashboard.funnel import build_rollup, funnel_breakdown, funnel_totals
+from dashboard.hr_metrics import clean_hr_data, compute_hr_metrics
+from dashboard.ingest import LibraryLog
+from dashboard.rankings import RankingIndex
+from dashboard.spans import span, span_frame
+
+# Dimensions of the pre-aggregated count cube of each dataset
+CUBE_DIMENSIONS = {
+    "final_student_data": ["Department", "State", "Gender", "Nationality", "Caste", "Graduation Type", "Stream Type", "Year Of Study", "Hostel"],
+    "campus": ["Department", "Company", "Company Type", "Gender", "Graduation Type"],
+}
+
+# Derived results kept per generation, least recently used first out
+MAX_DERIVED = 512
+
+# Seconds between two checks of data/ for changed files
+REFRESH_SECONDS = float(os.environ.get("DASHBOARD_REFRESH_SECONDS", 5))
+
+# The append-only logs are ingested incrementally by a LibraryLog instead
+LOGS = ("library_fact", "library_footfall_data")
+TABLES = [name for name in schema.SCHEMAS if name not in LOGS]
+
+QUERIES = {}
+
+# Queries run on every new generation before it is swapped in, so that the
+# first requests after a reload find the results they derive already built
+WARM_QUERIES = [
+    ("filter_options", ()),
+    ("hr_metrics", ()),
+    ("hr_experience_ranges", ()),
+    ("books_by_decade", ()),
+    ("books_by_price", ()),
+    ("search_catalogue", ("",)),
+    ("student_summary", ()),
+    ("cube_counts", ("final_student_data", ["Department"])),
+    ("funnel_values", ()),
+    ("ctc_summary", ()),
+    ("cube_counts", ("campus", ["Department"])),
+    ("entity_profile", ("",)),
+]
+
+logger = logging.getLogger(__name__)
+
+
+def query(func):
+    """Register ``func`` as a query under its name."""
+    QUERIES[func.__name__] = func
+    return func
+
+
+def _read_versions(library):
+    versions = {name: store.data_version(name) for name in TABLES}
+    versions["library_fact"] = library.circulation_version
+    versions["library_footfall_data"] = library.footfall_version
+    return versions
+
+
+class Generation:
+    """One consistent version of every table plus the results derived from it.
+
+    Only the cache of derived results changes once a generation is built, so
+    a query reads the same data from start to end even when a newer
+    generation is swapped in meanwhile. That includes the library logs: a
+    generation holds the ``LibrarySnapshot`` it was built from and its own
+    ``RankingIndex``, updated copy-on-write from the previous one.
+    """
+
+    def __init__(self, versions, library, previous=None):
+        self.versions = versions
+        self.version = hashlib.sha256(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:12]
+        self.built_at = pd.Timestamp.now()
+        self._lock = threading.Lock()
+        # A lock per result being built, so concurrent requests for it build it once
+        self._builds = {}
+        self._library = library
+        self._tables = {}
+        for name in TABLES:
+            if previous is not None and previous.versions[name] == versions[name]:
+                self._tables[name] = previous._tables[name]
+                continue
+            with span(f"load:{name}") as record:
+                arrow = store.load_arrow(name)
+                self._tables[name] = (arrow, store.to_pandas(arrow))
+                record.rows = arrow.num_rows
+        if previous is not None and previous.versions["library_dimension"] == versions["library_dimension"]:
+            rankings = previous._rankings
+        else:
+            rankings = RankingIndex(self.table("library_dimension"))
+        self._rankings = rankings.updated(library.circulation, library.circulation_generation)
+        # Derived results are keyed by the versions they were built from, so
+        # the ones of the tables that did not change are still valid
+        self._derived = OrderedDict() if previous is None else previous._copy_derived()
+
+    def data_version(self, *names):
+        """Return a short fingerprint of the versions of ``names``."""
+        return hashlib.sha256("".join(self.versions[name] for name in names).encode()).hexdigest()[:12]
+
+    def table(self, name):
+        return self._tables[name][1]
+
+    def scan(self, name, selection, columns=None):
+        """Return the Arrow rows of ``name`` matching ``selection``, see ``filters.scan``."""
+        return filters.scan(name, selection, columns, self._tables[name][0])
+
+    def rows(self, name, selection, columns):
+        """Return ``columns`` of the rows of ``name`` matching ``selection``."""
+        if not filters.applied(name, selection):
+            return self.table(name)[columns]
+        return store.to_pandas(self.scan(name, selection, columns))
+
+    def _cached(self, key, version):
+        with self._lock:
+            entry = self._derived.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._derived.move_to_end(key)
+            return entry
+
+    def derived(self, key, version, build):
+        """Return ``build()``, memoized under ``key`` until ``version`` changes."""
+        entry = self._cached(key, version)
+        if entry is not None:
+            return entry[1]
+        with self._lock:
+            build_lock = self._builds.setdefault((key, version), threading.Lock())
+        # Only the requests for this result wait while it is built, the
+        # generation's lock is held just to read and update the cache
+        with build_lock:
+            entry = self._cached(key, version)
+            if entry is not None:
+                return entry[1]
+            try:
+                value = build()
+                with self._lock:
+                    self._derived[key] = (version, value)
+                    if len(self._derived) > MAX_DERIVED:
+                        self._derived.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._builds.pop((key, version), None)
+            return value
+
+    def _copy_derived(self):
+        with self._lock:
+            return OrderedDict(self._derived)
+
+    def library(self):
+        """Return the ``LibrarySnapshot`` of the library logs."""
+        return self._library
+
+    def rankings(self):
+        return self._rankings
+
+
+class Datasets:
+    """The current ``Generation`` of the files in ``data/`` and its refresher.
+
+    ``refresh`` builds a new generation when a file changed, reusing the
+    tables and derived results of the ones that did not, runs the
+    ``WARM_QUERIES`` on it and only then swaps it in. ``start_refresher``
+    does so in a background thread, so requests never wait on a reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._library_log = None
+        self._refresher = None
+
+    def current(self):
+        """Return the generation new queries should run on."""
+        generation = self._generation
+        if generation is None:
+            # Nothing was loaded yet, so the very first query waits for it
+            self.refresh()
+            generation = self._generation
+        return generation
+
+    def refresh(self):
+        """Swap in a new generation if any file changed; return True when one was."""
+        with self._lock:
+            previous = self._generation
+            if self._library_log is None:
+                self._library_log = LibraryLog()
+            else:
+                self._library_log.refresh()
+            library = self._library_log.snapshot()
+            versions = _read_versions(library)
+            if previous is not None and versions == previous.versions:
+                return False
+            generation = Generation(versions, library, previous)
+            for name, args in WARM_QUERIES:
+                QUERIES[name](generation, *args)
+            # Queries already running keep the generation they started on
+            self._generation = generation
+        logger.info("Data version %s is now current", generation.version)
+        return True
+
+    def start_refresher(self, interval=REFRESH_SECONDS):
+        """Refresh every ``interval`` seconds in a background thread."""
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_forever, args=(interval,), name="datasets-refresher", daemon=True)
+                self._refresher.start()
+
+    def _refresh_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                # A file caught half written is read again on the next check,
+                # the current generation is served meanwhile
+                logger.exception("Refreshing the datasets failed")
+
+
+@query
+def data_version(data, *names):
+    return data.data_version(*names)
+
+
+@query
+def data_generation(data):
+    """The version of the generation queries run on and when it was loaded."""
+    return {"version": data.version, "built_at": data.built_at}
+
+
+@query
+def spans(data):
+    """The timing spans recorded by the process running the queries."""
+    return span_frame()
+
+
+@query
+def filter_options(data):
+    """The values offered by each global filter."""
+    return data.derived("filter_options", data.data_version(*TABLES), lambda: _filter_options(data))
+
+
+def _filter_options(data):
+    def distinct(name, key):
+        column = data.scan(name, (), [filters.COLUMNS[name][key]]).column(0)
+        if key == "year":
+            column = pc.year(column)
+        return set(pc.unique(column).to_pylist())
+
+    # Academic years are the years of the student intake and placement records
+    years = set().union(*(distinct(name, "year") for name in ["final_student_data", "student_enrollment", "campus"]))
+    departments = set().union(*(distinct(name, "department") for name in ["hr_analytics", "final_student_data", "student_enrollment", "campus"]))
+    graduation_types = set().union(*(distinct(name, "graduation_type") for name in ["final_student_data", "student_enrollment", "campus"]))
+    return {
+        "year": sorted(years - {None}),
+        "department": sorted(departments - {None}),
+        "stream": list(filters.STREAMS),
+        "graduation_type": sorted(graduation_types - {None}),
+    }
+
+
+@query
+def value_counts(data, name, column, exclude=(), only=(), selection=()):
+    """Count the rows of ``name`` per value of ``column``, most frequent first."""
+    values = data.rows(name, selection, [column])[column]
+    if exclude:
+        values = values[~values.isin(exclude)]
+    if only:
+        values = values[values.isin(only)]
+    return values.value_counts().loc[lambda counts: counts > 0]
+
+
+# ---HR---
+
+def _hr_data(data, selection):
+    selection = filters.applied("hr_analytics", selection)
+    return data.derived(("hr_data", selection), data.data_version("hr_analytics"),
+                        lambda: clean_hr_data(data.rows("hr_analytics", selection, list(schema.SCHEMAS["hr_analytics"]))))
+
+
+@query
+def hr_metrics(data, selection=()):
+    """Every field of ``HRMetrics`` as a dict, or None when no employee matches."""
+    selection = filters.applied("hr_analytics", selection)
+    hran = _hr_data(data, selection)
+    if hran.empty:
+        return None
+    metrics = data.derived(("hr_metrics", selection), data.data_version("hr_analytics"), lambda: compute_hr_metrics(hran))
+    return {field.name: getattr(metrics, field.name) for field in dataclasses.fields(metrics)}
+
+
+def _experience_ranges(hran):
+    # Group the experience of each employee; the edges do not depend on the
+    # rows, so a filtered selection without long-serving staff still bins
+    bins = [0, 2, 5, 10, 15, 20, 30, np.inf]
+    experience_range = pd.cut(hran["Experience"], bins, labels=["0-2", "3-5", "6-10", "11-15", "16-20", "21-30", "Above 31"])
+    return experience_range.value_counts().sort_index()
+
+
+@query
+def hr_experience_ranges(data, selection=()):
+    selection = filters.applied("hr_analytics", selection)
+    hran = _hr_data(data, selection)
+    return data.derived(("experience_ranges", selection), data.data_version("hr_analytics"), lambda: _experience_ranges(hran))
+
+
+# ---LIBRARY---
+
+@query
+def library_version(data):
+    return data.data_version("library_dimension", "library_members", *LOGS)
+
+
+@query
+def library_summary(data):
+    lib_dim = data.table("library_dimension")
+    lib_mem = data.table("library_members")
+    return {
+        "unique_books": lib_dim['Book Id'].nunique(),
+        "unique_authors": lib_dim['Author'].nunique(),
+        "unique_publishers": lib_dim['Publisher'].nunique(),
+        "staff_members": int(lib_mem["Member_ID"].str.startswith("Staff").sum()),
+        "student_members": int(lib_mem["Member_ID"].str.startswith("Student").sum()),
+    }
+
+
+def _books_by_decade(lib_dim):
+    decade = ((lib_dim['Year'] // 10) * 10).rename('Decade')
+    return lib_dim.groupby(decade)['Book Id'].count()
+
+
+@query
+def books_by_decade(data):
+    return data.derived("books_by_decade", data.data_version("library_dimension"), lambda: _books_by_decade(data.table("library_dimension")))
+
+
+def _books_by_price(lib_dim):
+    bins = [400, 800, 1200, 1600, 2000, 2400, 2800, 3200, 3600]
+    price_range = pd.cut(lib_dim['Book Price'], bins, labels=["400-800", "800-1200", "1200-1600", "1600-2000", "2000-2400", "2400-2800", "2800-3200", "3200-3600"]).rename('Price Range')
+    return lib_dim.groupby(price_range)['Book Id'].count()
+
+
+@query
+def books_by_price(data):
+    return data.derived("books_by_price", data.data_version("library_dimension"), lambda: _books_by_price(data.table("library_dimension")))
+
+
+@query
+def return_status_by_month(data, year):
+    """Count the checkouts made in ``year`` per return status and month."""
+    # The circulation log grows, so it is read from the log rather than its snapshot
+    lib_fact = data.library().circulation
+    # The year of a checkout is the one the year filter selects it by
+    checkout_date = lib_fact[filters.COLUMNS["library_fact"]["year"]]
+    lib_fact_year = lib_fact[checkout_date.dt.year == year].assign(Month=checkout_date.dt.month)
+    counts = lib_fact_year.groupby(['Returned  Status', 'Month'], observed=True)['Returned  Status'].count().reset_index(name='Count')
+    # Plotly colours by every category of a categorical column, including those without rows
+    return counts.astype({'Returned  Status': str})
+
+
+def _clamp_to_year(start, end, selection):
+    year = dict(filters.applied("library_fact", selection)).get("year")
+    if year is None:
+        return start, end
+    first, last = filters.year_bounds(year)
+    start = first if start is None else max(pd.Timestamp(start), pd.Timestamp(first))
+    end = last if end is None else min(pd.Timestamp(end), pd.Timestamp(last))
+    return start, end
+
+
+@query
+def checkout_range(data, selection=()):
+    """The first and last checkout dates, within the selected year if any."""
+    start, end = data.rankings().checkout_range()
+    if start is None:
+        return start, end
+    start, end = _clamp_to_year(start, end, selection)
+    if start > end:
+        # Nothing was checked out in the selected year; offer the whole year
+        return _clamp_to_year(None, None, selection)
+    return start, end
+
+
+@query
+def top_books(data, k=10, start=None, end=None, selection=()):
+    start, end = _clamp_to_year(start, end, selection)
+    return data.rankings().top_books(k, start, end)
+
+
+@query
+def top_authors(data, k=10):
+    return data.rankings().top_authors(k)
+
+
+@query
+def top_publishers(data, k=10):
+    return data.rankings().top_publishers(k)
+
+
+@query
+def footfall(data, period, selection=()):
+    """Footfall and conversion totals per 'D'ay or 'M'onth, indexed by the period as text."""
+    library = data.library()
+    totals = library.monthly_footfall if period == 'M' else library.daily_footfall
+    totals = totals.set_axis(totals.index.astype(str), axis=0)
+    year = dict(filters.applied("library_footfall_data", selection)).get("year")
+    if year is not None:
+        totals = totals[totals.index.str.startswith(str(year))]
+    return totals
+
+
+def _catalogue(data):
+    return data.derived("catalogue", data.data_version("library_dimension"), lambda: load_index(data.table("library_dimension")))
+
+
+def _catalogue_checkouts(data):
+    # The checkouts of every catalogue book, in catalogue order
+    def build():
+        book_ids = data.table("library_dimension")["Book Id"]
+        return data.library().checkouts.reindex(book_ids).fillna(0).to_numpy(dtype="int64")
+
+    return data.derived("catalogue_checkouts", data.data_version("library_dimension", "library_fact"), build)
+
+
+@query
+def search_catalogue(data, text, k=20):
+    """The ``k`` books best matching ``text`` by title, author or publisher, with their checkouts."""
+    checkouts = _catalogue_checkouts(data)
+    positions, scores = _catalogue(data).search(text, k, popularity=checkouts)
+    result_df = data.table("library_dimension").iloc[positions][["Book Id", "Title", "Author", "Publisher"]].reset_index(drop=True)
+    result_df["Checkouts"] = checkouts[positions]
+    result_df["Score"] = scores.round(2)
+    result_df.index += 1
+    return result_df
+
+
+# ---STUDENTS AND PLACEMENTS---
+
+def _filtered_counts(data, name, dimensions, selection):
+    table = data.scan(name, selection, list(dimensions))
+    counts = table.group_by(list(dimensions)).aggregate([(dimensions[0], "count", pc.CountOptions(mode="all"))])
+    counts = plain_values(store.to_pandas(counts).rename(columns={f"{dimensions[0]}_count": COUNT})[[*dimensions, COUNT]], dimensions)
+    if len(dimensions) == 1:
+        counts = counts.sort_values(COUNT, ascending=False, kind="stable").reset_index(drop=True)
+    return counts
+
+
+@query
+def cube_counts(data, name, dimensions, selection=()):
+    """Row counts of ``name`` per value of one dimension or a pair of dimensions."""
+    selection = filters.applied(name, selection)
+    if selection:
+        # The cube only covers the whole table; filtered counts are grouped by the scan
+        return data.derived(("counts", name, tuple(dimensions), selection), data.data_version(name),
+                            lambda: _filtered_counts(data, name, dimensions, selection))
+    cube = data.derived(("cube", name), data.data_version(name), lambda: build_cube(data.table(name), CUBE_DIMENSIONS[name]))
+    return _cube_counts(cube, *dimensions)
+
+
+def _funnel_rollup(data):
+    return data.derived("funnel", data.data_version("student_enrollment"), lambda: build_rollup(data.table("student_enrollment")))
+
+
+@query
+def funnel_values(data):
+    """The values of every admissions funnel dimension."""
+    return _funnel_rollup(data)[1]
+
+
+@query
+def admissions_funnel(data, by, fixed=(), selection=()):
+    """Funnel totals with the ``fixed`` dimensions and the selection held, and their breakdown by ``by`` if given."""
+    rollup, values = _funnel_rollup(data)
+    # The filters name the same columns as the rollup, and the intake year is its Year
+    fixed = {**dict(fixed), **filters.column_values("student_enrollment", selection)}
+    breakdown = None if by is None else funnel_breakdown(rollup, values, fixed, by)
+    return {"totals": funnel_totals(rollup, fixed), "breakdown": breakdown}
+
+
+def _count_true(array):
+    return pc.sum(array).as_py() or 0
+
+
+def _student_summary(data, selection):
+    flags = ["Discontinued Flag", "Retained Flag", "Moved Between Department Flag"]
+    students = data.scan("final_student_data", selection, ["Gender", *flags])
+    return {
+        "total_students": students.num_rows,
+        "male_students": _count_true(pc.equal(students["Gender"], "Male")),
+        "female_students": _count_true(pc.equal(students["Gender"], "Female")),
+        "discontinued": _count_true(students["Discontinued Flag"]),
+        "retained": _count_true(students["Retained Flag"]),
+        "moved": _count_true(students["Moved Between Department Flag"]),
+    }
+
+
+@query
+def student_summary(data, selection=()):
+    selection = filters.applied("final_student_data", selection)
+    return data.derived(("student_summary", selection), data.data_version("final_student_data"), lambda: _student_summary(data, selection))
+
+
+def _ctc_summary(data, selection):
+    ctc = data.scan("campus", selection, ["CTC"])["CTC"]
+    extremes = pc.min_max(ctc)
+    return {"mean_ctc": pc.mean(ctc).as_py(), "max_ctc": extremes["max"].as_py(), "min_ctc": extremes["min"].as_py()}
+
+
+@query
+def ctc_summary(data, selection=()):
+    """Mean, maximum and minimum CTC, all None when no placement matches."""
+    selection = filters.applied("campus", selection)
+    return data.derived(("ctc_summary", selection), data.data_version("campus"), lambda: _ctc_summary(data, selection))
+
+
+# ---PEOPLE---
+
+def _entity_index(data):
+    names = ["hr_analytics", "final_student_data", "campus", "library_members"]
+
+    def build():
+        tables = {name: data.table(name) for name in names}
+        tables["hr_analytics"] = _hr_data(data, ())
+        tables["library_fact"] = data.library().circulation
+        return EntityIndex(tables)
+
+    return data.derived("entities", data.data_version(*names, "library_fact"), build)
+
+
+@query
+def entity_profile(data, text):
+    """Every record held about the student or staff member with the ID ``text``, or None."""
+    return _entity_index(data).lookup(text)
@@ -0,0 +1,106 @@
+"""Book popularity and author/publisher rankings for the library page.
+
+The index maps every catalogue book to its checkout count and keeps the
+checkout events sorted by date, so top-K queries over any date window are
+answered with a heap selection instead of re-joining the catalogue with the
+circulation log.
+"""
+import copy
+import heapq
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+BOOK_COLUMNS = ['Book Id', 'Title', 'Author', 'Publisher', 'Genre']
+
+
+def _top(counts, k):
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+
+class RankingIndex:
+    """Checkout and title-count rankings over the library catalogue.
+
+    An index never changes once built: ``updated`` returns a new one that
+    also counts the checkouts appended since, so the queries reading an
+    index meanwhile are not affected.
+    """
+
+    def __init__(self, lib_dim):
+        self.books = lib_dim[BOOK_COLUMNS].reset_index(drop=True)
+        self._position = {book_id: position for position, book_id in enumerate(self.books['Book Id'])}
+        self.author_titles = lib_dim['Author'].value_counts(sort=False).loc[lambda counts: counts > 0].to_dict()
+        self.publisher_titles = lib_dim['Publisher'].value_counts(sort=False).loc[lambda counts: counts > 0].to_dict()
+        self._reset()
+
+    def _reset(self):
+        self._checkouts = np.zeros(len(self.books), dtype="int64")
+        self._dates = np.array([], dtype="datetime64[ns]")
+        self._codes = np.array([], dtype="int64")
+        self._generation = None
+        self._seen = 0
+
+    def _add_checkouts(self, rows):
+        # Only called on an index no query can see yet; every array is replaced, not changed
+        codes = rows['Book ID'].map(self._position)
+        known = codes.notna().to_numpy()
+        codes = codes.to_numpy()[known].astype("int64")
+        dates = rows['Date'].to_numpy(dtype="datetime64[ns]")[known]
+        self._checkouts = self._checkouts + np.bincount(codes, minlength=len(self.books))
+        self._dates = np.concatenate([self._dates, dates])
+        self._codes = np.concatenate([self._codes, codes])
+        # Appended rows are usually in date order; only re-sort when not
+        if len(self._dates) > 1 and (np.diff(self._dates) < np.timedelta64(0)).any():
+            order = np.argsort(self._dates, kind="stable")
+            self._dates, self._codes = self._dates[order], self._codes[order]
+
+    def updated(self, circulation, generation):
+        """Return an index that also counts the rows of ``circulation`` this one has not.
+
+        ``generation`` is the number of times the circulation log was reloaded
+        from scratch; when it changed the new index counts every row again.
+        """
+        if generation == self._generation and len(circulation) == self._seen:
+            return self
+        index = copy.copy(self)
+        if generation != self._generation:
+            index._reset()
+            index._generation = generation
+        if len(circulation) > index._seen:
+            index._add_checkouts(circulation.iloc[index._seen:])
+            index._seen = len(circulation)
+        return index
+
+    def checkout_range(self):
+        """Return the first and last checkout dates in the index."""
+        if not len(self._dates):
+            return None, None
+        return pd.Timestamp(self._dates[0]), pd.Timestamp(self._dates[-1])
+
+    def top_books(self, k=10, start=None, end=None):
+        """Return the ``k`` most checked out books, optionally between two dates."""
+        if start is None and end is None:
+            counts = self._checkouts
+        else:
+            lower = 0 if start is None else np.searchsorted(self._dates, np.datetime64(start, "ns"))
+            upper = len(self._dates) if end is None else np.searchsorted(self._dates, np.datetime64(end, "ns"), side="right")
+            counts = np.bincount(self._codes[lower:upper], minlength=len(self.books))
+        nonzero = np.flatnonzero(counts)
+        top = _top(dict(zip(nonzero, counts[nonzero])), k)
+        result_df = self.books.iloc[[position for position, _ in top]].reset_index(drop=True)
+        result_df['Checkouts'] = [count for _, count in top]
+        result_df.index += 1
+        return result_df
+
+    def top_authors(self, k=10):
+        """Return the ``k`` authors with the most titles in the catalogue."""
+        result_df = pd.DataFrame(_top(self.author_titles, k), columns=['Author', 'Number of books'])
+        result_df.index += 1
+        return result_df
+
+    def top_publishers(self, k=10):
+        """Return the ``k`` publishers with the most titles in the catalogue."""
+        result_df = pd.DataFrame(_top(self.publisher_titles, k), columns=['Publisher', 'Number of Books'])
+        result_df.index += 1
+        return result_df
@@ -0,0 +1,318 @@
+"""Static HTML/JSON snapshots of the default state of every page.
+
+Most viewers only look at the pages as they open, so those views can be
+served as static files instead of rerunning Python for every visit. Each
+page runs headless through Streamlit's AppTest in a pool of worker
+processes, once as it opens and once for every other option of each of
+its ``VARIANTS`` widgets, the options being read from the page as it
+opens. The titles, metrics, tables and Plotly figures it draws are
+written to ``<page>/<view>.json`` and a standalone ``<page>/<view>.html``
+under the output directory (``data/.static`` by default). Widgets and the
+decorative images are left out.
+
+    python -m dashboard.render --workers 4
+
+The views of a page are only rendered again when the data, the page
+script or the ``dashboard`` package changed since the last run, see
+``manifest.json``.
+"""
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import plotly.io
+
+from dashboard import schema, store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.path.join(store.DATA_DIR, ".static")
+
+# The directory each page is rendered into
+PAGES = {
+    "1_HR_Analytics.py": "hr",
+    "pages/2_Library_Analytics.py": "library",
+    "pages/3_Student_Analytics.py": "student",
+    "pages/4_Campus_Analytics.py": "campus",
+}
+
+# The widgets of a page whose every option is rendered as its own view:
+# selectboxes by label and the ``lazy_tabs`` radios by key
+VARIANTS = {
+    "1_HR_Analytics.py": [("radio", "hr_view"), ("radio", "hr_top_10")],
+    "pages/2_Library_Analytics.py": [("radio", "library_book_view"), ("radio", "library_top_10"), ("radio", "library_footfall_period")],
+    "pages/3_Student_Analytics.py": [("selectbox", "View Students By:")],
+    "pages/4_Campus_Analytics.py": [("selectbox", "View Placed Students By:")],
+}
+
+# The element types written to a bundle, the rest are widgets
+HEADINGS = {"title": "h1", "header": "h2", "subheader": "h3"}
+TEXTS = {"markdown", "caption", "info", "warning", "success", "error"}
+
+STYLE = """
+body { font-family: sans-serif; margin: 2rem auto; max-width: 1200px; color: #262730; }
+nav a { margin-right: 1rem; }
+.row { display: flex; gap: 1rem; }
+.row > div { flex: 1; }
+.metric { padding: 0.5rem 0; }
+.metric .label { font-size: 0.9rem; }
+.metric .value { font-size: 2rem; }
+table { border-collapse: collapse; font-size: 0.9rem; }
+th, td { border: 1px solid #ddd; padding: 0.25rem 0.5rem; }
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def view_name(variant):
+    """Return the file name of a view, ``variant`` being its ``(kind, widget, option)`` or None."""
+    if variant is None:
+        return "index"
+    _, widget, option = variant
+    return f"{_slug(widget)}--{_slug(option)}"
+
+
+def _sources():
+    # The package is hashed along with the page, since the pages draw through it
+    package = os.path.join(ROOT, "dashboard")
+    return sorted(os.path.join(package, name) for name in os.listdir(package) if name.endswith(".py"))
+
+
+def fingerprint(page, data_version):
+    """Return what the rendered views of ``page`` depend on: the data, the page script and the package."""
+    digest = hashlib.sha256()
+    for path in [os.path.join(ROOT, page), *_sources()]:
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return f"{data_version}-{digest.hexdigest()[:12]}"
+
+
+# ---EXTRACTION---
+
+def _elements(block):
+    """Return the drawn content of an AppTest block as JSON-compatible dicts."""
+    elements = []
+    for node in block.children.values():
+        if node.type in HEADINGS:
+            elements.append({"kind": "heading", "level": node.type, "text": node.value})
+        elif node.type in TEXTS:
+            elements.append({"kind": "text", "text": node.value})
+        elif node.type == "metric":
+            elements.append({"kind": "metric", "label": node.label, "value": node.value, "delta": node.delta or None})
+        elif node.type == "dataframe":
+            elements.append({"kind": "table", **json.loads(node.value.to_json(orient="split", index=False, date_format="iso"))})
+        elif node.type == "plotly_chart":
+            elements.append({"kind": "figure", "spec": json.loads(node.proto.spec)})
+        elif hasattr(node, "children"):
+            columns = [child for child in node.children.values() if child.type == "column"]
+            if columns:
+                elements.append({"kind": "row", "columns": [_elements(column) for column in columns]})
+            else:
+                elements.extend(_elements(node))
+    return elements
+
+
+def _widget(app, kind, widget):
+    if kind == "radio":
+        return app.radio(key=widget)
+    return next(box for box in app.selectbox if box.label == widget)
+
+
+def run_page(page, variant):
+    """Run ``page`` headless with one variant widget set and return its elements and variants.
+
+    The variants are the ``(kind, widget, option)`` of every option of the
+    page's ``VARIANTS`` widgets but the one it opens with.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, page), default_timeout=600).run()
+    variants = []
+    for kind, widget in VARIANTS.get(page, []):
+        found = _widget(app, kind, widget)
+        variants.extend((kind, widget, option) for option in found.options if option != found.value)
+    if variant is not None:
+        kind, widget, option = variant
+        _widget(app, kind, widget).set_value(option).run()
+    if app.exception:
+        raise RuntimeError(f"{page} failed: {app.exception[0].value}")
+    return _elements(app.main), variants
+
+
+# ---HTML---
+
+def _html_elements(elements, figures):
+    parts = []
+    for element in elements:
+        kind = element["kind"]
+        if kind == "heading":
+            tag = HEADINGS[element["level"]]
+            parts.append(f"<{tag}>{html.escape(element['text'])}</{tag}>")
+        elif kind == "text":
+            parts.append(f"<p>{html.escape(element['text'])}</p>")
+        elif kind == "metric":
+            delta = f"<div>{html.escape(element['delta'])}</div>" if element["delta"] else ""
+            parts.append(
+                f'<div class="metric"><div class="label">{html.escape(element["label"])}</div>'
+                f'<div class="value">{html.escape(element["value"])}</div>{delta}</div>'
+            )
+        elif kind == "table":
+            header = "".join(f"<th>{html.escape(str(column))}</th>" for column in element["columns"])
+            rows = "".join(
+                "<tr>" + "".join(f"<td>{html.escape('' if value is None else str(value))}</td>" for value in row) + "</tr>"
+                for row in element["data"]
+            )
+            parts.append(f"<table><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>")
+        elif kind == "figure":
+            # plotly.js is loaded once, by the first figure of the page
+            parts.append(plotly.io.to_html(element["spec"], include_plotlyjs="cdn" if not figures else False, full_html=False, validate=False))
+            figures.append(element)
+        elif kind == "row":
+            columns = "".join(f"<div>{_html_elements(column, figures)}</div>" for column in element["columns"])
+            parts.append(f'<div class="row">{columns}</div>')
+    return "\n".join(parts)
+
+
+def _navigation(page, variants):
+    # Every page as it opens, then the other views of this page
+    links = [f'<a href="../{directory}/index.html">{directory.title()}</a>' for directory in PAGES.values()]
+    for variant in variants:
+        label = f"{PAGES[page].title()}: {variant[2]}"
+        links.append(f'<a href="../{PAGES[page]}/{view_name(variant)}.html">{html.escape(label)}</a>')
+    return "<nav>" + "".join(links) + "</nav>"
+
+
+def to_html(elements, data_version, page, variants):
+    """Return a standalone HTML page drawing ``elements``, linking to the other ``variants`` of ``page``."""
+    title = next((element["text"] for element in elements if element["kind"] == "heading"), "Institutional Dashboard")
+    return (
+        f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+        f"<style>{STYLE}</style></head>\n<body>{_navigation(page, variants)}\n"
+        f"{_html_elements(elements, [])}\n"
+        f"<footer><p>Data version {data_version}</p></footer></body></html>\n"
+    )
+
+
+# ---RENDERING---
+
+def _write_atomic(path, text):
+    # Readers never see a half written file
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, "w", encoding="utf-8") as output:
+        output.write(text)
+    os.replace(temporary, path)
+
+
+def render_view(page, variant, out_dir, data_version, variants=None):
+    """Render one view into ``out_dir`` and return how long it took and the variants of the page.
+
+    ``variants`` are the page's variants when already known, for the links
+    between its views.
+    """
+    start = time.perf_counter()
+    elements, found = run_page(page, variant)
+    variants = found if variants is None else variants
+    directory = os.path.join(out_dir, PAGES[page])
+    os.makedirs(directory, exist_ok=True)
+    name = view_name(variant)
+    option = None if variant is None else {"widget": variant[1], "value": variant[2]}
+    bundle = {"page": page, "option": option, "data_version": data_version, "elements": elements}
+    _write_atomic(os.path.join(directory, f"{name}.json"), json.dumps(bundle))
+    _write_atomic(os.path.join(directory, f"{name}.html"), to_html(elements, data_version, page, variants))
+    return time.perf_counter() - start, variants
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, "manifest.json")) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return {}
+
+
+def _index_html():
+    links = "".join(f'<li><a href="{directory}/index.html">{directory.title()}</a></li>' for directory in PAGES.values())
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Institutional Dashboard</title></head>\n'
+        f"<body><h1>Institutional Dashboard</h1><ul>{links}</ul></body></html>\n"
+    )
+
+
+def render(out_dir=OUTPUT_DIR, workers=None, force=False):
+    """Render every view of every stale page into ``out_dir`` and return the number rendered."""
+    # Snapshots are built here once rather than by every worker at the same time
+    data_version = store.data_version(*schema.SCHEMAS)
+    pages = _read_manifest(out_dir).get("pages", {})
+    fingerprints = {page: fingerprint(page, data_version) for page in PAGES}
+    stale = [page for page in PAGES if force or pages.get(PAGES[page], {}).get("fingerprint") != fingerprints[page]]
+    if not stale:
+        logger.info("Every view is up to date for data version %s", data_version)
+        return 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    rendered = {page: [] for page in stale}
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A page is rendered as it opens first, which tells the variants to render next
+        futures = {pool.submit(render_view, page, None, out_dir, data_version): (page, None) for page in stale}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                page, variant = futures.pop(future)
+                key = f"{PAGES[page]}/{view_name(variant)}"
+                try:
+                    seconds, variants = future.result()
+                except Exception:
+                    logger.exception("Rendering %s failed", key)
+                    failed.append(key)
+                    continue
+                rendered[page].append(view_name(variant))
+                logger.info("Rendered %s in %.2f s", key, seconds)
+                if variant is None:
+                    for other in variants:
+                        futures[pool.submit(render_view, page, other, out_dir, data_version, variants)] = (page, other)
+
+    for page in stale:
+        # A page with a failed view is rendered again next time
+        if any(key.startswith(f"{PAGES[page]}/") for key in failed):
+            pages.pop(PAGES[page], None)
+        else:
+            pages[PAGES[page]] = {"fingerprint": fingerprints[page], "views": sorted(rendered[page])}
+    _write_atomic(os.path.join(out_dir, "index.html"), _index_html())
+    # Written last, so an interrupted run renders the remaining pages next time
+    _write_atomic(os.path.join(out_dir, "manifest.json"), json.dumps({"data_version": data_version, "pages": pages}, indent=2))
+    if failed:
+        raise RuntimeError(f"{len(failed)} views failed to render: {', '.join(sorted(failed))}")
+    return sum(len(views) for views in rendered.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=OUTPUT_DIR, help="directory to write the HTML and JSON bundles to")
+    parser.add_argument("--workers", type=int, help="number of worker processes, by default one per CPU")
+    parser.add_argument("--force", action="store_true", help="render every view even if it is up to date")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    sys.path.insert(0, ROOT)
+    try:
+        render(args.out, args.workers, args.force)
+    except RuntimeError as error:
+        logger.error("%s", error)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # The workers look render_view up by module and AppTest replaces __main__
+    from dashboard.render import main
+    main()
@@ -0,0 +1,142 @@
+"""Declared column types for every CSV in ``data/``.
+
+Each column is given one of the following types:
+
+* a numpy dtype name such as ``"int16"`` or ``"float32"`` (fixed widths, so
+  rows appended later cannot overflow a width picked from today's data),
+* ``"category"`` for repeated labels,
+* ``"datetime"`` for ISO dates,
+* ``"yes_no"`` for Yes/No answers, loaded as nullable booleans,
+* ``"flag"`` for 0/1 indicator columns, loaded as nullable booleans,
+* ``"object"`` for free text and identifiers.
+"""
+import pandas as pd
+
+SCHEMAS = {
+    "hr_analytics": {
+        "Staff_Id": "int32",
+        "Name": "object",
+        "Age": "int16",
+        "Department": "category",
+        "Designation": "category",
+        "Stream": "category",
+        "Gender": "category",
+        "Qualification": "category",
+        "Experience": "float64",
+        "Is_Associated_Last_Year": "yes_no",
+        # "In pipeline" is a third answer, so this stays a label
+        "Currently_Working": "category",
+        "Joining_Date": "datetime",
+        # Mixes dates, "--" and partial dates
+        "Leaving_Date": "category",
+        "Association_Type": "category",
+        "Salary": "int32",
+    },
+    "library_dimension": {
+        "S.No": "int32",
+        "Book Id": "object",
+        "Author": "category",
+        "Title": "object",
+        "Genre": "category",
+        "Language": "category",
+        "Publisher": "category",
+        "Year": "int16",
+        "Book Price": "int32",
+    },
+    "library_fact": {
+        "Date": "datetime",
+        " ID": "category",
+        "Name": "category",
+        "Book ID": "category",
+        "Due Date": "datetime",
+        "Return Date": "datetime",
+        "Day of Delay": "float32",
+        "Fine Amount": "float32",
+        "Returned  Status": "category",
+        "Damage": "yes_no",
+        "Fine amount Due Date": "datetime",
+        "Paid Status": "yes_no",
+        "Paid Date": "datetime",
+        "Fine Amount Returned Status": "category",
+    },
+    "library_members": {
+        "Member_ID": "object",
+        "Count of  ID": "int32",
+    },
+    "library_footfall_data": {
+        "Date": "datetime",
+        "Time_Slot": "category",
+        "Footfall_Count": "int32",
+        "Conversion_Count": "int32",
+    },
+    "final_student_data": {
+        "Entry Date": "datetime",
+        "Stream Type": "category",
+        "Gender": "category",
+        "Nationality": "category",
+        "Department": "category",
+        "Student Name": "object",
+        "Caste": "category",
+        "Enrollment Id": "object",
+        "Graduation Type": "category",
+        "Year Of Study": "category",
+        "Hostel": "category",
+        "Discontinued": "yes_no",
+        "Moved Between Department": "yes_no",
+        "Is Retained": "yes_no",
+        "Has Graduated": "yes_no",
+        "CGPA": "float32",
+        "Has Arrears": "yes_no",
+        "State": "category",
+        "Rca For Discontinued": "category",
+        "Discontinued Flag": "flag",
+        "Retained Flag": "flag",
+        "Moved Between Department Flag": "flag",
+    },
+    "student_enrollment": {
+        "Year": "datetime",
+        "Department": "category",
+        "Nationality": "category",
+        "Stream Type": "category",
+        "Caste": "category",
+        "Graduation Type": "category",
+        "Applied Students": "int32",
+        "Enrolled Students": "int32",
+        "Selected Students": "int32",
+    },
+    "campus": {
+        "Year": "datetime",
+        "Department": "category",
+        "Student Name": "object",
+        "Enrollement ID": "object",
+        "Graduation Type": "category",
+        "Gender": "category",
+        "Campus (On/Off)": "yes_no",
+        "Company": "category",
+        "Company Type": "category",
+        "Position": "category",
+        "CTC": "float64",
+        "Student Rejection": "yes_no",
+    },
+}
+
+# Types that pd.read_csv can produce directly while parsing
+_PARSE_TYPES = {"category", "object", "int16", "int32", "int64", "float32", "float64"}
+
+_YES_NO = {"yes": True, "no": False}
+
+
+def read_csv(name, source):
+    """Parse ``source`` with the declared schema of the ``name`` dataset."""
+    schema = SCHEMAS[name]
+    dtypes = {column: kind for column, kind in schema.items() if kind in _PARSE_TYPES}
+    df = pd.read_csv(source, dtype=dtypes)
+    for column, kind in schema.items():
+        if kind == "datetime":
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+        elif kind == "yes_no":
+            answers = df[column].astype("object").str.strip().str.lower()
+            df[column] = answers.map(_YES_NO).astype("boolean")
+        elif kind == "flag":
+            df[column] = df[column].astype("boolean")
+    return df
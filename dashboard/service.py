@@ -0,0 +1,231 @@
+"""A long-lived process that owns the data and answers the pages' queries.
+
+Run one service per host next to the Streamlit replicas:
+
+    python -m dashboard.service
+
+It loads every table once, keeps the derived results warm across Streamlit
+restarts, reloads the files in ``data/`` that change in a background thread
+(see ``Datasets``) and listens on a Unix socket (``DASHBOARD_SOCKET``, by default
+``data/.snapshots/service.sock``). Pages call ``fetch``, which sends the
+query name and arguments as JSON and receives the result with every
+DataFrame and Series encoded as an Arrow IPC stream. When no service is
+listening, ``fetch`` runs the query in the calling process instead.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dashboard import store
+from dashboard.cache import _view
+from dashboard.queries import QUERIES, Datasets
+from dashboard.spans import row_count, span
+
+SOCKET_PATH = os.environ.get("DASHBOARD_SOCKET", os.path.join(store.SNAPSHOT_DIR, "service.sock"))
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceError(RuntimeError):
+    """A query failed inside the data service."""
+
+
+# ---WIRE FORMAT---
+# A message is a length-prefixed JSON header followed by one length-prefixed
+# Arrow IPC stream per DataFrame or Series it carries.
+
+def _encode(value, tables):
+    if isinstance(value, pd.DataFrame):
+        tables.append(pa.Table.from_pandas(value))
+        return {"frame": len(tables) - 1}
+    if isinstance(value, pd.Series):
+        tables.append(pa.Table.from_pandas(value.to_frame(name="values" if value.name is None else value.name)))
+        return {"series": len(tables) - 1, "name": value.name}
+    if isinstance(value, dict):
+        return {"dict": {key: _encode(item, tables) for key, item in value.items()}}
+    if isinstance(value, (tuple, list)):
+        return {"tuple" if isinstance(value, tuple) else "list": [_encode(item, tables) for item in value]}
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return {"timestamp": value.isoformat()}
+    if isinstance(value, np.generic):
+        value = value.item()
+    return {"value": value}
+
+
+def _decode(encoded, frames):
+    if "frame" in encoded:
+        return frames[encoded["frame"]]
+    if "series" in encoded:
+        return frames[encoded["series"]].iloc[:, 0].rename(encoded["name"])
+    if "dict" in encoded:
+        return {key: _decode(item, frames) for key, item in encoded["dict"].items()}
+    if "tuple" in encoded:
+        return tuple(_decode(item, frames) for item in encoded["tuple"])
+    if "list" in encoded:
+        return [_decode(item, frames) for item in encoded["list"]]
+    if "timestamp" in encoded:
+        return pd.Timestamp(encoded["timestamp"])
+    return encoded["value"]
+
+
+def _send(sock, value):
+    tables = []
+    header = json.dumps(_encode(value, tables)).encode()
+    parts = [struct.pack("!Q", len(header)), header]
+    for table in tables:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue()
+        parts += [struct.pack("!Q", body.size), body]
+    sock.sendall(b"".join(parts))
+
+
+def _read_exactly(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    while view:
+        received = sock.recv_into(view)
+        if not received:
+            raise ConnectionError("the connection closed mid-message")
+        view = view[received:]
+    return buffer
+
+
+def _receive(sock):
+    size, = struct.unpack("!Q", _read_exactly(sock, 8))
+    encoded = json.loads(_read_exactly(sock, size))
+    frames = []
+
+    def count(node):
+        # Number of Arrow streams following the header
+        if "frame" in node or "series" in node:
+            return 1
+        children = node.get("dict", {}).values() if "dict" in node else node.get("tuple", node.get("list", []))
+        return sum(count(child) for child in children)
+
+    for _ in range(count(encoded)):
+        size, = struct.unpack("!Q", _read_exactly(sock, 8))
+        body = _read_exactly(sock, size)
+        frames.append(pa.ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas())
+    return _decode(encoded, frames)
+
+
+# ---SERVER---
+
+def run_query(datasets, name, args):
+    if name not in QUERIES:
+        raise KeyError(f"unknown query {name!r}")
+    with span(f"query:{name}") as record:
+        result = QUERIES[name](datasets.current(), *args)
+        record.rows = row_count(result)
+    return result
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            name, args = _receive(self.request)
+        except ConnectionError:
+            # A client probing whether the service is up, see service_available
+            return
+        try:
+            result = {"result": run_query(self.server.datasets, name, args)}
+        except Exception as error:
+            logger.exception("Query %s%r failed", name, tuple(args))
+            result = {"error": f"{type(error).__name__}: {error}"}
+        _send(self.request, result)
+
+
+class DataService(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path=SOCKET_PATH, datasets=None):
+        self.datasets = Datasets() if datasets is None else datasets
+        # A previous service that was killed leaves its socket file behind
+        if os.path.exists(path):
+            os.unlink(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        super().__init__(path, _Handler)
+
+
+# ---CLIENT---
+
+_local_lock = threading.Lock()
+_local = None
+
+
+def _local_datasets():
+    global _local
+    with _local_lock:
+        if _local is None:
+            _local = Datasets()
+            _local.start_refresher()
+        return _local
+
+
+def _fetch_remote(name, args):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(SOCKET_PATH)
+        _send(sock, (name, list(args)))
+        reply = _receive(sock)
+    if "error" in reply:
+        raise ServiceError(reply["error"])
+    return reply["result"]
+
+
+def service_available():
+    """Return True when a data service is listening on ``SOCKET_PATH``."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(SOCKET_PATH)
+        return True
+    except OSError:
+        return False
+
+
+def fetch(name, *args):
+    """Run the query ``name`` in the data service, or locally when none is running."""
+    with span(f"fetch:{name}") as record:
+        try:
+            result = _fetch_remote(name, args)
+        except (FileNotFoundError, ConnectionRefusedError):
+            # Callers share the locally cached results, so they get shallow copies
+            result = _view(run_query(_local_datasets(), name, args))
+        record.rows = row_count(result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard data over a Unix socket.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="path of the Unix socket to listen on")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    # Stop cleanly, removing the socket, when the process manager stops the service
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    service = DataService(args.socket)
+    service.datasets.refresh()
+    service.datasets.start_refresher()
+    logger.info("Serving %s on %s", store.DATA_DIR, args.socket)
+    try:
+        service.serve_forever()
+    finally:
+        service.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
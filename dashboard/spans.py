@@ -0,0 +1,126 @@
+"""Timing spans for finding the slow parts of a rerun.
+
+Wrap any block in ``with span(name):`` to record its wall time, optionally
+with the rows it processed and the bytes it sent to the browser. The
+sections of a page are marked with ``PageSections`` instead, so the page
+code keeps its indentation. Spans go
+into a bounded in-memory ring buffer per process, which the diagnostics
+page summarizes per name (count, p50, p95) and exports as JSON lines.
+
+Names are prefixed with what they time:
+
+* ``section:<page>/<header>`` a section of a page,
+* ``cache:<page>.<function>`` a call to a ``cached`` loader or figure,
+* ``fetch:<query>`` a query as seen by a page, including the round trip,
+* ``query:<query>`` a query as run inside the data service,
+* ``load:<dataset>`` a table (re)loaded from its snapshot,
+* ``figure:<title>`` serializing and sending a Plotly figure.
+"""
+import collections
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+BUFFER_SIZE = 10000
+
+_lock = threading.Lock()
+_buffer = collections.deque(maxlen=BUFFER_SIZE)
+
+
+@dataclass
+class Span:
+    name: str
+    # Wall clock time the span started at, in seconds since the epoch
+    start: float
+    seconds: float = 0.0
+    rows: int = None
+    payload_bytes: int = None
+
+
+def _record(record):
+    with _lock:
+        _buffer.append(record)
+
+
+@contextmanager
+def span(name, rows=None):
+    """Time the enclosed block as ``name``.
+
+    The yielded ``Span`` can be given ``rows`` and ``payload_bytes`` once
+    they are known inside the block.
+    """
+    record = Span(name, time.time(), rows=rows)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _record(record)
+
+
+class PageSections:
+    """Times the consecutive sections of one run of a page.
+
+    ``start`` marks where a section begins and ends the one before it, and
+    ``end`` ends the last one. A section cut short by ``st.stop`` or an
+    exception is not recorded.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._current = None
+
+    def start(self, name):
+        self.end()
+        self._current = (Span(f"section:{self.page}/{name}", time.time()), time.perf_counter())
+
+    def end(self):
+        if self._current is not None:
+            record, start = self._current
+            record.seconds = time.perf_counter() - start
+            _record(record)
+            self._current = None
+
+
+def row_count(value):
+    """Return the number of rows in a query result, or None when it has none."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def recorded_spans():
+    """Return the spans in the buffer, oldest first."""
+    with _lock:
+        return list(_buffer)
+
+
+def span_frame(spans=None):
+    """Return ``spans`` (by default the whole buffer) as a DataFrame."""
+    spans = recorded_spans() if spans is None else spans
+    return pd.DataFrame([asdict(record) for record in spans], columns=["name", "start", "seconds", "rows", "payload_bytes"])
+
+
+def to_jsonl(frame):
+    """Return the spans of ``span_frame`` as JSON lines."""
+    return "".join(json.dumps(record) + "\n" for record in json.loads(frame.to_json(orient="records")))
+
+
+def summarize(frame):
+    """Return the count, p50, p95 and max wall time, mean rows and mean payload per span name."""
+    grouped = frame.groupby("name")
+    milliseconds = grouped["seconds"]
+    summary = pd.DataFrame({
+        "Calls": grouped.size(),
+        "p50 (ms)": 1000 * milliseconds.quantile(0.5),
+        "p95 (ms)": 1000 * milliseconds.quantile(0.95),
+        "Max (ms)": 1000 * milliseconds.max(),
+        "Total (s)": milliseconds.sum(),
+        "Mean Rows": grouped["rows"].mean(),
+        "Mean Payload (KB)": grouped["payload_bytes"].mean() / 1024,
+    })
+    return summary.round(3).sort_values("Total (s)", ascending=False).rename_axis("Span").reset_index()
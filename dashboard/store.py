@@ -0,0 +1,212 @@
+"""Columnar snapshot store for the CSV files in ``data/``.
+
+Every CSV is parsed once with its declared schema (see ``schema.py``) and
+converted into an uncompressed Arrow IPC file under ``data/.snapshots``.
+Snapshots are memory-mapped when loaded, so the Streamlit worker processes
+on a host share the same OS pages instead of each parsing and holding a
+private copy of the CSV.
+"""
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from dashboard import schema
+
+# DASHBOARD_DATA_DIR points the dashboard at another copy of the data,
+# e.g. the scaled datasets used by the benchmarks
+DATA_DIR = os.environ.get("DASHBOARD_DATA_DIR", "data")
+SNAPSHOT_DIR = os.path.join(DATA_DIR, ".snapshots")
+
+
+def source_path(name):
+    return os.path.join(DATA_DIR, f"{name}.csv")
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.arrow")
+
+
+def _manifest_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+
+def _file_sha256(path, size=None):
+    # Hash the whole file, or only its first ``size`` bytes
+    digest = hashlib.sha256()
+    remaining = os.path.getsize(path) if size is None else size
+    with open(path, "rb") as source:
+        while remaining > 0:
+            chunk = source.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _read_manifest(name):
+    try:
+        with open(_manifest_path(name)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path, write):
+    """Call ``write`` with a temporary path, then move the file it wrote to ``path``."""
+    # Write to a temporary file first so that concurrent workers never
+    # observe a half written snapshot.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_manifest(name, manifest):
+    def write(tmp_path):
+        with open(tmp_path, "w") as out:
+            json.dump(manifest, out)
+    write_atomic(_manifest_path(name), write)
+
+
+def read_source(name, source=None):
+    """Parse the CSV for ``name`` (or ``source``, a path or buffer) into a typed DataFrame."""
+    return schema.read_csv(name, source_path(name) if source is None else source)
+
+
+def _schema_hash(name):
+    return hashlib.sha256(repr(sorted(schema.SCHEMAS[name].items())).encode()).hexdigest()[:12]
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+def build_snapshot(name):
+    """Convert ``data/<name>.csv`` into its Arrow snapshot."""
+    stat = os.stat(source_path(name))
+    # Parse the exact bytes that are hashed, so the manifest describes the
+    # snapshot even when the file is appended to meanwhile.
+    with open(source_path(name), "rb") as source:
+        raw = source.read()
+    typed = read_source(name, io.BytesIO(raw))
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    write_atomic(snapshot_path(name), write)
+    _write_manifest(name, {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": len(raw),
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "schema": _schema_hash(name),
+        # Memory taken by the typed frame; a plain pd.read_csv of the file is
+        # only measured when the memory report asks for it
+        "typed_bytes": _frame_bytes(typed),
+    })
+
+
+def is_fresh(name):
+    """Return True when the snapshot for ``name`` matches its source CSV."""
+    manifest = _read_manifest(name)
+    if (manifest is None or not os.path.exists(snapshot_path(name))
+            or manifest.get("schema") != _schema_hash(name)):
+        return False
+    stat = os.stat(source_path(name))
+    if (manifest["mtime_ns"], manifest["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return True
+    # The file was touched: only rebuild when its contents really changed.
+    if stat.st_size == manifest["size"] and _file_sha256(source_path(name)) == manifest["sha256"]:
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        _write_manifest(name, manifest)
+        return True
+    return False
+
+
+def ensure_snapshot(name):
+    if not is_fresh(name):
+        build_snapshot(name)
+    return snapshot_path(name)
+
+
+def _map_snapshot(name):
+    source = pa.memory_map(snapshot_path(name), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def to_pandas(table):
+    """Convert an Arrow table read from a snapshot into a DataFrame."""
+    # split_blocks keeps every column in its own block so that numeric
+    # columns can stay zero-copy views on the mapped file.
+    return table.to_pandas(split_blocks=True)
+
+
+def load_arrow(name):
+    """Return the memory-mapped Arrow table for ``name``."""
+    ensure_snapshot(name)
+    return _map_snapshot(name)
+
+
+def load_table(name):
+    """Return ``data/<name>.csv`` as a DataFrame backed by its snapshot."""
+    return to_pandas(load_arrow(name))
+
+
+def load_prefix(name):
+    """Return the snapshot of an append-only CSV and the source bytes it covers.
+
+    When rows were only appended since the snapshot was built, the snapshot
+    is reused as is and the caller parses the bytes after the returned size.
+    """
+    manifest = _read_manifest(name)
+    if (manifest is None or not os.path.exists(snapshot_path(name))
+            or manifest.get("schema") != _schema_hash(name)
+            or os.path.getsize(source_path(name)) < manifest["size"]
+            or _file_sha256(source_path(name), manifest["size"]) != manifest["sha256"]):
+        build_snapshot(name)
+        manifest = _read_manifest(name)
+    return to_pandas(_map_snapshot(name)), manifest["size"]
+
+
+def data_version(*names):
+    """Return a short fingerprint of the source files behind ``names``."""
+    digest = hashlib.sha256()
+    for name in names:
+        ensure_snapshot(name)
+        digest.update(_read_manifest(name)["sha256"].encode())
+    return digest.hexdigest()[:12]
+
+
+def _untyped_bytes(name, manifest):
+    """Return the memory a plain ``pd.read_csv`` of the snapshotted bytes takes, measuring it once."""
+    if "untyped_bytes" not in manifest:
+        with open(source_path(name), "rb") as source:
+            raw = source.read(manifest["size"])
+        manifest["untyped_bytes"] = _frame_bytes(pd.read_csv(io.BytesIO(raw)))
+        # Unless the snapshot was rebuilt meanwhile
+        if (_read_manifest(name) or {}).get("sha256") == manifest["sha256"] == hashlib.sha256(raw).hexdigest():
+            _write_manifest(name, manifest)
+    return manifest["untyped_bytes"]
+
+
+def memory_report():
+    """Return the memory saved by the declared schema for every dataset."""
+    rows = []
+    for name in schema.SCHEMAS:
+        ensure_snapshot(name)
+        manifest = _read_manifest(name)
+        manifest["untyped_bytes"] = _untyped_bytes(name, manifest)
+        rows.append({
+            "Dataset": name,
+            "Untyped (KB)": round(manifest["untyped_bytes"] / 1024, 1),
+            "Typed (KB)": round(manifest["typed_bytes"] / 1024, 1),
+            "Saving": f'{manifest["untyped_bytes"] / manifest["typed_bytes"]:.1f}x',
+        })
+    return pd.DataFrame(rows)
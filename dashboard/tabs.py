@@ -0,0 +1,12 @@
+"""Tab-like section selector that only runs the visible section."""
+import streamlit as st
+
+
+def lazy_tabs(label, labels, key):
+    """Show ``labels`` as a row of tabs and return the selected one.
+
+    Streamlit runs the body of every ``st.tabs`` container on each rerun.
+    Pages branch on the returned label instead, so only the visible section
+    is computed.
+    """
+    return st.radio(label, labels, horizontal=True, key=key, label_visibility="collapsed")
@@ -1,24 +1,34 @@
-import numpy as np
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objs as go
 
+from dashboard.cache import cached
+from dashboard.figures import count_bars, line_trace, show
+from dashboard.filter_bar import filter_bar
+from dashboard.service import fetch
+from dashboard.spans import PageSections
+from dashboard.tabs import lazy_tabs
+
 st.set_page_config(page_title="Library Dashboard -Institutional Dashboard", page_icon=":bar_chart:", layout="wide", initial_sidebar_state="auto")
 
-# Importing all datasets
+sections = PageSections("Library Analytics")
+sections.start("Load")
+# The data service owns the library tables and ingests the rows appended to the circulation and footfall logs
+lib_version = fetch("library_version")
+# The book views and the footfall graph only change with their own log
+books_version = fetch("data_version", "library_dimension", "library_fact")
+footfall_version = fetch("data_version", "library_footfall_data")
+# Only the academic year applies here, to the circulation and footfall logs
+lib_selection = filter_bar(["library_fact", "library_footfall_data"])
 
-@st.cache(allow_output_mutation=True)
-def load_lib_data():
-    lib_dim = pd.read_csv("data/library_dimension.csv")
-    lib_fact = pd.read_csv("data/library_fact.csv")
-    lib_mem = pd.read_csv("data/library_members.csv")
-    lib_foot = pd.read_csv("data/library_footfall_data.csv")
-    return lib_dim, lib_fact, lib_mem, lib_foot
+@cached(max_entries=2)
+def load_library_summary(version):
+    return fetch("library_summary")
 
-lib_dim, lib_fact, lib_mem, lib_foot = load_lib_data()
+library_summary = load_library_summary(lib_version)
 
 
+sections.start("Book Metrics")
 st.title("Library Dashboard")
 st.header("Book Metrics")
 
@@ -28,154 +38,164 @@ unique_books_col , unique_authors_col, unique_pubs_col = st.columns(3)
 with unique_books_col:
     st.image('images/book.png')
 # To find the unique Number of Books
-num_unique_books = lib_dim['Book Id'].nunique()
+num_unique_books = library_summary["unique_books"]
 unique_books_col.metric("Unique Books ", num_unique_books)
 
 with unique_authors_col:
     st.image('images/editor.png')
 # To find the unique Number of Authors
-num_unique_authors = lib_dim['Author'].nunique()
+num_unique_authors = library_summary["unique_authors"]
 unique_authors_col.metric("Unique Authors ", num_unique_authors)
 
 with unique_pubs_col:
     st.image('images/publisher.png')
 # To find the unique Number of Publishers
-num_unique_pubs = lib_dim['Publisher'].nunique()
+num_unique_pubs = library_summary["unique_publishers"]
 unique_pubs_col.metric("Unique Publishers ", num_unique_pubs)
 
+sections.start("Search the Catalogue")
+st.header("Search the Catalogue")
+# Answered from the catalogue index, so every keystroke only costs a lookup
+search_text = st.text_input("Title, author or publisher:", placeholder="e.g. jaina philosophy or Sreenivasan")
+if search_text.strip():
+    search_results = fetch("search_catalogue", search_text, 20)
+    if search_results.empty:
+        st.info(f"No book matches {search_text.strip()!r}.")
+    else:
+        st.dataframe(search_results, use_container_width=True)
+
+sections.start("View Books by")
 st.header("View Books by")
-lang_graph_tab , genre_graph_tab, year_graph_tab, price_graph_tab, return_status_tab= st.tabs(["Language", "Genre", "Year of Publishing", "Price", "Return Status"])
-
-# Plotting Graphs on Book Metrics
-
-with lang_graph_tab:
-    books_by_lang_fig = px.histogram(lib_dim, x="Language", nbins=50, title="Number of Books Based on Languages")
+# Plotting Graphs on Book Metrics, each figure is only built when its view is selected and is memoized per data version
+@cached(max_entries=2)
+def lang_figure(version, selection):
+    # Counted by the data service so the figure carries one bar per language rather than every book
+    books_by_lang = fetch("value_counts", "library_dimension", "Language")
+    books_by_lang_fig = count_bars(books_by_lang, title="Number of Books Based on Languages")
     books_by_lang_fig.update_traces(texttemplate='%{y}', textposition='outside')
     books_by_lang_fig.update_layout(xaxis_title='Language', yaxis_title='Number of Books', uniformtext_minsize=8, uniformtext_mode='hide')
     books_by_lang_fig.update_xaxes(showgrid=False)
     books_by_lang_fig.update_yaxes(showgrid=False)
-    st.plotly_chart(books_by_lang_fig, use_container_width=True)
+    return books_by_lang_fig
 
-with genre_graph_tab:
+@cached(max_entries=2)
+def genre_figure(version, selection):
     # Plot the distribution of books by genre
-    books_by_genre_fig = px.histogram(lib_dim, x="Genre", nbins=50, title="Number of Books Based on Genre")
+    books_by_genre = fetch("value_counts", "library_dimension", "Genre")
+    books_by_genre_fig = count_bars(books_by_genre, title="Number of Books Based on Genre")
     books_by_genre_fig.update_traces(texttemplate='%{y}', textposition='outside')
     books_by_genre_fig.update_layout(xaxis_title='Genre', yaxis_title='Number of Books', uniformtext_minsize=8, uniformtext_mode='hide')
     books_by_genre_fig.update_xaxes(showgrid=False)
     books_by_genre_fig.update_yaxes(showgrid=False)
-    st.plotly_chart(books_by_genre_fig, use_container_width=True)
+    return books_by_genre_fig
 
-with year_graph_tab:
-    lib_dim['Year'] = pd.to_datetime(lib_dim['Year'], format='%Y')
-    # Group the data by decade
-    lib_dim['Decade'] = (lib_dim['Year'].dt.year // 10) * 10
+@cached(max_entries=2)
+def year_figure(version, selection):
     # Count the number of books per decade
-    decade_counts = lib_dim.groupby('Decade')['Book Id'].count()
+    decade_counts = fetch("books_by_decade")
     # Create the bar graph using Plotly Express
     year_fig = px.bar(decade_counts, x=decade_counts.index, y=decade_counts.values, title="Books Based on Year of Publishing", labels={'x': 'Year of Publishing', 'y': 'Number of Books'})
     year_fig.update_traces(texttemplate='%{y}', textposition='outside')
     year_fig.update_xaxes(showgrid=False)
     year_fig.update_yaxes(showgrid=False)
-    st.plotly_chart(year_fig, use_container_width=True)
-
-with price_graph_tab:
-    #Books based on Price
-    bins = [400, 800, 1200, 1600, 2000, 2400, 2800, 3200, 3600]
-    # Cut the Book Price column into bins
-    lib_dim['Price Range'] = pd.cut(lib_dim['Book Price'], bins, labels=["400-800", "800-1200", "1200-1600", "1600-2000", "2000-2400", "2400-2800", "2800-3200", "3200-3600"])
-    # Count the number of books in each bin
-    bin_counts = lib_dim.groupby('Price Range')['Book Id'].count()
+    return year_fig
+
+@cached(max_entries=2)
+def price_figure(version, selection):
+    # Count the number of books in each price range
+    bin_counts = fetch("books_by_price")
     # Create the bar graph using Plotly Express
     price_fig = px.bar(bin_counts, x=bin_counts.index, y=bin_counts.values, title="Books Based on Price", labels={'x': 'Price range (in INR)', 'y': 'Number of books'})
     price_fig.update_traces(texttemplate='%{y}', textposition='outside')
     price_fig.update_xaxes(showgrid=False)
     price_fig.update_yaxes(showgrid=False)
-    st.plotly_chart(price_fig, use_container_width=True)
-
-with return_status_tab:
-    lib_fact['Due Date'] = pd.to_datetime(lib_fact['Due Date'])
-    lib_fact_2019 = lib_fact[lib_fact['Due Date'].dt.year == 2019]
-    lib_fact_2019['Due Date'] = pd.to_datetime(lib_fact_2019['Due Date'])
-    lib_fact_2019['Month'] = lib_fact_2019['Due Date'].dt.month
-    # Group the data by the Return Status and Month columns
-    grouped_df = lib_fact_2019.groupby(['Returned  Status', 'Month'])['Returned  Status'].count().reset_index(name='Count')
+    return price_fig
+
+@cached(max_entries=2)
+def return_status_figure(version, selection):
+    year = dict(selection).get("year", 2019)
+    # Checkouts made in the year grouped by the Return Status and Month columns
+    grouped_df = fetch("return_status_by_month", year)
+    if grouped_df.empty:
+        return None
     # Create a bar chart using Plotly Express
     return_status_fig = px.bar(grouped_df, x='Month', y='Count', color='Returned  Status')
     # Update the chart layout
-    return_status_fig.update_layout(title='Return Status by Month in 2019', xaxis_title='Month', yaxis_title='Count')
+    return_status_fig.update_layout(title=f'Return Status by Month in {year}', xaxis_title='Month', yaxis_title='Count')
     # Show the chart
     return_status_fig.update_xaxes(showgrid=False)
     return_status_fig.update_yaxes(showgrid=False)
-    st.plotly_chart(return_status_fig, use_container_width=True)
-
+    return return_status_fig
+
+book_figures = {
+    "Language": lang_figure,
+    "Genre": genre_figure,
+    "Year of Publishing": year_figure,
+    "Price": price_figure,
+    "Return Status": return_status_figure,
+}
+selected_book_view = lazy_tabs("View Books by", list(book_figures), key="library_book_view")
+book_fig = book_figures[selected_book_view](books_version, lib_selection)
+if book_fig is None:
+    # No checkout was made in the selected year
+    st.info(f"No books to show by {selected_book_view} for the selected filters.")
+else:
+    show(book_fig)
+
+sections.start("The Top Tens")
 st.header("The Top Tens")
-popular_books_tab, auth_group_tab, pub_group_tab = st.tabs(["Top 10 Popular Book","Top 10 Authors by Number of Books", "Top 10 Publishers by Number of Books"])
-
-with popular_books_tab:
-    # Merging the two tables on the Book ID column
-    merged_df = pd.merge(lib_dim, lib_fact, left_on='Book Id', right_on='Book ID', how='inner')
-    # Grouping the data by Book ID and counting the number of times each book was checked out
-    grouped_df = merged_df.groupby(['Book Id'])['Book ID'].count().reset_index(name='Count')
-    # Sorting the data in descending order based on the count
-    sorted_df = grouped_df.sort_values(by='Count', ascending=False)
-    # Selecting the first 10 rows to get the top 10 books by popularity
-    top_10_df = sorted_df.head(10)
-    # Merging the top 10 books data with the `lib_dim` dataframe to get the Book Id, Name, Author, Publisher, Genre information
-    result_df = pd.merge(top_10_df, lib_dim, left_on='Book Id', right_on='Book Id', how='inner')[['Book Id', 'Title', 'Author', 'Publisher', 'Genre']]
-    # Displaying the result dataframe
-    result_df.index += 1
-    st.dataframe(result_df)
-
-with auth_group_tab:
-    # Displaying the Top 10 Authors by books
-    author_group = lib_dim.groupby('Author').count()['Book Id']
-    top_10_authors = author_group.nlargest(10)
-    top_10_authors_df = pd.DataFrame({'Author': top_10_authors.index, 'Number of books': top_10_authors.values})
-    top_10_authors_df = top_10_authors_df.reset_index(drop=True)
-    top_10_authors_df.index += 1
-    st.dataframe(top_10_authors_df)
-
-with pub_group_tab:
-    # Displaying Top 10 Publishers by Books
-    publisher_grouped = lib_dim.groupby('Publisher')
-    publisher_counts = publisher_grouped['Book Id'].count()
-    publisher_df = publisher_counts.reset_index().rename(columns={'Book Id': 'Number of Books'})
-    publisher_df = publisher_df.sort_values(by='Number of Books', ascending=False)
-    publisher_df = publisher_df.reset_index(drop=True)
-    publisher_df.index += 1
-    st.dataframe(publisher_df.head(10))
-
-
+# The rankings are kept by the data service and catch up with the circulation log on each refresh
+selected_top_10 = lazy_tabs("The Top Tens", ["Top 10 Popular Book", "Top 10 Authors by Number of Books", "Top 10 Publishers by Number of Books"], key="library_top_10")
+if selected_top_10 == "Top 10 Popular Book":
+    # Restrict the checkouts to a date window
+    # The window starts over whenever the selected year changes
+    checkout_window = st.date_input("Checked out between", fetch("checkout_range", lib_selection), key=f"library_checkout_window_{dict(lib_selection).get('year')}")
+    if len(checkout_window) == 2:
+        st.dataframe(fetch("top_books", 10, *checkout_window, lib_selection))
+    else:
+        st.dataframe(fetch("top_books", 10, None, None, lib_selection))
+elif selected_top_10 == "Top 10 Authors by Number of Books":
+    st.dataframe(fetch("top_authors", 10))
+else:
+    st.dataframe(fetch("top_publishers", 10))
+
+
+sections.start("Member Metrics")
 st.header("Member Metrics")
 #Member Metrics
 staff_member_col, student_member_col, total_member_col = st.columns(3)
 
 # Count the number of staff members
-num_staff = len(lib_mem[lib_mem["Member_ID"].str.startswith("Staff")])
+num_staff = library_summary["staff_members"]
 staff_member_col.metric("Staff Members:", num_staff)
 
 # Count the number of student members
-num_students = len(lib_mem[lib_mem["Member_ID"].str.startswith("Student")])
+num_students = library_summary["student_members"]
 student_member_col.metric("Student Members:", num_students)
 
 # Count the Total Members
 total_lib_members = num_staff + num_students
 total_member_col.metric("Total Members:", total_lib_members)
 
+sections.start("Footfall and Conversion in Library")
 st.header("Footfall and Conversion in Library")
-# Convert the 'Date' column to a datetime format
-lib_foot['Date'] = pd.to_datetime(lib_foot['Date'])
-# Group the data by month and year, and sum the footfall count and conversion count for each group
-lib_foot_monthly = lib_foot.groupby(lib_foot['Date'].dt.to_period('M')).sum().astype(str)
-# Convert the PeriodIndex to a string index
-lib_foot_monthly.index = lib_foot_monthly.index.astype(str)
-# Create a line graph using Plotly
-lib_foot_monthly_fig = go.Figure()
-lib_foot_monthly_fig.add_trace(go.Scatter(x=lib_foot_monthly.index, y=lib_foot_monthly['Footfall_Count'], name='Footfall_Count', text=lib_foot_monthly['Footfall_Count'], textposition='bottom center'))
-lib_foot_monthly_fig.add_trace(go.Scatter(x=lib_foot_monthly.index, y=lib_foot_monthly['Conversion_Count'], name='Conversion_Count', text=lib_foot_monthly['Conversion_Count'], textposition='bottom center'))
-
-# Set the title and axis labels
-lib_foot_monthly_fig.update_layout(title='Footfall Count and Conversion Count by Month', xaxis_title='Month', yaxis_title='Count')
+# Footfall count and conversion count totals, updated as the footfall log grows
+footfall_period = lazy_tabs("Footfall by", ["Monthly", "Daily"], key="library_footfall_period")
+period_name = "Month" if footfall_period == "Monthly" else "Day"
+# Memoized per data version, so a rerun shows the figure already measured against the payload budget
+@cached(max_entries=4)
+def footfall_figure(version, period_name, selection):
+    lib_foot = fetch("footfall", period_name[0], selection)
+    # Create a line graph, long daily series are downsampled and drawn with WebGL
+    lib_foot_fig = go.Figure()
+    lib_foot_fig.add_trace(line_trace(lib_foot.index, lib_foot['Footfall_Count'], name='Footfall_Count', text=lib_foot['Footfall_Count']))
+    lib_foot_fig.add_trace(line_trace(lib_foot.index, lib_foot['Conversion_Count'], name='Conversion_Count', text=lib_foot['Conversion_Count']))
+
+    # Set the title and axis labels
+    lib_foot_fig.update_layout(title=f'Footfall Count and Conversion Count by {period_name}', xaxis_title=period_name, yaxis_title='Count')
+    return lib_foot_fig
 
 # Display the graph
-st.plotly_chart(lib_foot_monthly_fig, use_container_width=True)
\ No newline at end of file
+show(footfall_figure(footfall_version, period_name, lib_selection))
+
+sections.end()
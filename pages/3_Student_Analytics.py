@@ -1,30 +1,45 @@
-import numpy as np
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 
+from dashboard.cache import cached
+from dashboard.figures import show
+from dashboard.filter_bar import filter_bar
+from dashboard.filters import COLUMNS, applied
+from dashboard.cube import COUNT
+from dashboard.funnel import DIMENSIONS, STAGES
+from dashboard.queries import CUBE_DIMENSIONS
+from dashboard.service import fetch
+from dashboard.spans import PageSections
+
 st.set_page_config(page_title="Student Dashboard-Institutional Dashboard", page_icon=":bar_chart:", layout="wide", initial_sidebar_state="auto")
 
-@st.cache()
-def load_student_data():
-    final_student_data = pd.read_csv("data/final_student_data.csv")
-    student_enrollment = pd.read_csv("data/student_enrollment.csv")
-    return final_student_data, student_enrollment
+categories = CUBE_DIMENSIONS["final_student_data"]
+
+sections = PageSections("Student Analytics")
+sections.start("Load")
+# The data service owns the student tables; the page only asks it for aggregates
+student_version = fetch("data_version", "final_student_data")
+student_selection = filter_bar(["final_student_data", "student_enrollment"])
+
+@cached(max_entries=2)
+def load_student_summary(version, selection):
+    return fetch("student_summary", selection)
 
-final_student_data, student_enrollment = load_student_data()
+student_summary = load_student_summary(student_version, student_selection)
 
+sections.start("Student Metrics")
 #---STUDENT METRICS---
 st.title("Student Dashboard")
 st.header("Student Metrics")
 total_students_col, total_male_students_col, total_female_students_col = st.columns(3)
 
 #Total Students
-total_students = final_student_data.shape[0]
+total_students = student_summary["total_students"]
 # Total number of male students
-total_male_students = final_student_data[final_student_data["Gender"] == "Male"].shape[0]
+total_male_students = student_summary["male_students"]
 # Total number of female students
-total_female_students = final_student_data[final_student_data["Gender"] == "Female"].shape[0]
+total_female_students = student_summary["female_students"]
 
 # Print the results
 with total_students_col:
@@ -37,29 +52,74 @@ with total_female_students_col:
     st.image('images/female-student.png')
 total_female_students_col.metric("Female Students: ", total_female_students)
 
+sections.start("Student Information Graphics")
 #---STUDENTS CATEGORY DROPDOWN---
 st.header("Student Information Graphics")
-categories = ["Department", "State", "Gender", "Nationality", "Caste", "Graduation Type", "Stream Type", "Year Of Study","Hostel"]
-
 selected_category = st.selectbox("View Students By:", categories)
+split_category = st.selectbox("Split By:", ["None"] + [category for category in categories if category != selected_category])
+
+# Memoized per data version, so a rerun shows the figure already measured against the payload budget
+@cached(max_entries=8)
+def category_figure(version, selected_category, split_category, selection):
+    # Charts are drawn from the pre-aggregated counts instead of the raw rows
+    if split_category == "None":
+        category_counts = fetch("cube_counts", "final_student_data", [selected_category], selection)
+        hist_fig = px.bar(category_counts, x=selected_category, y=COUNT)
+        hist_fig.update_traces(texttemplate='%{y}', textposition='outside')
+    else:
+        category_counts = fetch("cube_counts", "final_student_data", [selected_category, split_category], selection)
+        hist_fig = px.bar(category_counts, x=selected_category, y=COUNT, color=split_category)
+    hist_fig.update_layout(title=f"Distribution of Students based on {selected_category}", xaxis_title=selected_category, yaxis_title="Number of Students")
+    hist_fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
+    hist_fig.update_xaxes(showgrid=False)
+    hist_fig.update_yaxes(showgrid=False)
+    return hist_fig
 
-hist_fig = px.histogram(final_student_data, x=selected_category, nbins=100)
-hist_fig.update_layout(title=f"Distribution of Students based on {selected_category}", xaxis_title=selected_category, yaxis_title="Number of Students")
-hist_fig.update_traces(texttemplate='%{y}', textposition='outside')
-hist_fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-hist_fig.update_xaxes(showgrid=False)
-hist_fig.update_yaxes(showgrid=False)
-st.plotly_chart(hist_fig, use_container_width=True)
+show(category_figure(student_version, selected_category, split_category, student_selection))
 
+sections.start("Student Info")
 #---STUDENT METRICS TWO
 st.header("Student Info")
 discontinued_col, retained_col, moved_col = st.columns(3)
-discontinued = final_student_data[final_student_data["Discontinued Flag"] == 1].shape[0]
+discontinued = student_summary["discontinued"]
 # Get the number of students who were retained
-retained = final_student_data[final_student_data["Retained Flag"] == 1].shape[0]
+retained = student_summary["retained"]
 # Get the number of students who moved between departments
-moved = final_student_data[final_student_data["Moved Between Department Flag"] == 1].shape[0]
+moved = student_summary["moved"]
 
 discontinued_col.metric("Discontinued Students", discontinued)
 retained_col.metric("Retained Students", retained)
 moved_col.metric("Department Change - Students", moved)
+
+sections.start("Admissions Funnel")
+#---ADMISSIONS FUNNEL---
+st.header("Admissions Funnel")
+# Every drill-down is a lookup in the rollup the data service keeps over student_enrollment.csv
+funnel_values = fetch("funnel_values")
+nationality_col, caste_col, breakdown_col = st.columns(3)
+nationality = nationality_col.selectbox("Nationality:", ["All"] + funnel_values["Nationality"])
+caste = caste_col.selectbox("Caste:", ["All"] + funnel_values["Caste"])
+funnel_fixed = tuple((dimension, value) for dimension, value in [("Nationality", nationality), ("Caste", caste)] if value != "All")
+# Dimensions held by the drill-down or the sidebar filters cannot be broken down further
+held = {dimension for dimension, _ in funnel_fixed} | {COLUMNS["student_enrollment"][key] for key, _ in applied("student_enrollment", student_selection)}
+breakdown_dimensions = [dimension for dimension in DIMENSIONS if dimension not in held]
+if breakdown_dimensions:
+    breakdown_by = breakdown_col.selectbox("Break Down By:", breakdown_dimensions)
+else:
+    # Every dimension is held, only the totals are left
+    breakdown_by = None
+    breakdown_col.caption("Every dimension is held, so there is nothing left to break down by.")
+
+@cached(max_entries=8)
+def funnel_figure(version, breakdown_by, funnel_fixed, selection):
+    funnel_totals = fetch("admissions_funnel", breakdown_by, funnel_fixed, selection)["totals"]
+    funnel_fig = go.Figure(go.Funnel(y=STAGES, x=funnel_totals.values, textinfo="value+percent initial"))
+    funnel_fig.update_layout(title="Applied, Selected and Enrolled Students")
+    return funnel_fig
+
+admissions_funnel = fetch("admissions_funnel", breakdown_by, funnel_fixed, student_selection)
+show(funnel_figure(fetch("data_version", "student_enrollment"), breakdown_by, funnel_fixed, student_selection))
+if breakdown_by is not None:
+    st.dataframe(admissions_funnel["breakdown"], use_container_width=True)
+
+sections.end()
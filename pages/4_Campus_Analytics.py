@@ -1,20 +1,37 @@
-import numpy as np
-import pandas as pd
 import streamlit as st
 import plotly.express as px
 
+from dashboard.cache import cached
+from dashboard.figures import show
+from dashboard.filter_bar import filter_bar
+from dashboard.cube import COUNT
+from dashboard.queries import CUBE_DIMENSIONS
+from dashboard.service import fetch
+from dashboard.spans import PageSections
+
 st.set_page_config(page_title="Campus Placement-Institutional Dashboard", page_icon=":bar_chart:", layout="wide", initial_sidebar_state="auto")
 
-@st.cache(allow_output_mutation=True)
-def load_campus_data():
-    campus = pd.read_csv("data/campus.csv")
-    return campus
+categories = CUBE_DIMENSIONS["campus"]
+
+sections = PageSections("Campus Analytics")
+sections.start("Load")
+# The data service owns the placement table; the page only asks it for aggregates
+campus_version = fetch("data_version", "campus")
+campus_selection = filter_bar(["campus"])
 
-campus = load_campus_data()
+@cached(max_entries=2)
+def load_ctc_summary(version, selection):
+    return fetch("ctc_summary", selection)
 
+ctc_summary = load_ctc_summary(campus_version, campus_selection)
+
+sections.start("CTC Metrics")
 st.title("Placement Dashboard")
 def format_number(num):
-    if num >= 1e9:
+    if num is None:
+        # No placement matches the selected filters
+        return '-'
+    elif num >= 1e9:
         return '₹ {:.1f}B'.format(num / 1e9)
     elif num >= 1e6:
         return '₹ {:.1f}M'.format(num / 1e6)
@@ -22,28 +39,43 @@ def format_number(num):
         return '₹ {:.1f}K'.format(num / 1e3)
     else:
         return '₹ {:,.0f}'.format(num)
-    
+
 #CTC Metrics
 mean_ctc_col , max_ctc_col, min_ctc_col = st.columns(3)
 # Find mean CTC
-mean_ctc = campus['CTC'].mean()
+mean_ctc = ctc_summary["mean_ctc"]
 mean_ctc_col.metric("Mean CTC", format_number(mean_ctc))
 # Find maximum CTC
-max_ctc = campus['CTC'].max()
+max_ctc = ctc_summary["max_ctc"]
 max_ctc_col.metric("Maximum CTC", format_number(max_ctc))
 # Find minimum CTC
-min_ctc = campus['CTC'].min()
+min_ctc = ctc_summary["min_ctc"]
 min_ctc_col.metric("Minimum CTC", format_number(min_ctc))
 
 
+sections.start("Student Placement Graphics")
 #---PLACEMENT GRAPH---
 st.header("Student Placement Graphics")
-categories = ["Department", "Company", "Company Type", "Gender","Graduation Type"]
 selected_category = st.selectbox("View Placed Students By:", categories)
-placement_fig = px.histogram(campus, x=selected_category, nbins=25)
-placement_fig.update_layout(title=f"Placement of Students based on {selected_category}", xaxis_title=selected_category, yaxis_title="Number of Students")
-placement_fig.update_traces(texttemplate='%{y}', textposition='outside')
-placement_fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-placement_fig.update_xaxes(showgrid=False)
-placement_fig.update_yaxes(showgrid=False)
-st.plotly_chart(placement_fig, use_container_width=True)
\ No newline at end of file
+split_category = st.selectbox("Split By:", ["None"] + [category for category in categories if category != selected_category])
+
+# Memoized per data version, so a rerun shows the figure already measured against the payload budget
+@cached(max_entries=8)
+def category_figure(version, selected_category, split_category, selection):
+    # Charts are drawn from the pre-aggregated counts instead of the raw rows
+    if split_category == "None":
+        category_counts = fetch("cube_counts", "campus", [selected_category], selection)
+        placement_fig = px.bar(category_counts, x=selected_category, y=COUNT)
+        placement_fig.update_traces(texttemplate='%{y}', textposition='outside')
+    else:
+        category_counts = fetch("cube_counts", "campus", [selected_category, split_category], selection)
+        placement_fig = px.bar(category_counts, x=selected_category, y=COUNT, color=split_category)
+    placement_fig.update_layout(title=f"Placement of Students based on {selected_category}", xaxis_title=selected_category, yaxis_title="Number of Students")
+    placement_fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
+    placement_fig.update_xaxes(showgrid=False)
+    placement_fig.update_yaxes(showgrid=False)
+    return placement_fig
+
+show(category_figure(campus_version, selected_category, split_category, campus_selection))
+
+sections.end()
@@ -0,0 +1,58 @@
+import streamlit as st
+
+from dashboard.filter_bar import hide_diagnostics_link, show_data_version
+from dashboard.service import fetch
+
+st.set_page_config(page_title="Student/Staff 360 -Institutional Dashboard", page_icon=":bar_chart:", layout="wide", initial_sidebar_state="auto")
+
+st.title("Student/Staff 360")
+hide_diagnostics_link()
+show_data_version()
+entity_id = st.text_input("Student or Staff ID:", placeholder="e.g. Student02739 or Staff007")
+if not entity_id:
+    st.info("Enter a student or staff ID to see every record held about them.")
+    st.stop()
+
+# The data service answers from its entity index, without joining the tables
+profile = fetch("entity_profile", entity_id)
+if profile is None:
+    st.warning(f"No student or staff member has the ID {entity_id.strip()}.")
+    st.stop()
+
+records = profile["records"]
+checkouts = records["library_fact"]
+st.header(profile["id"])
+
+if profile["kind"] == "student":
+    student_records = records["final_student_data"]
+    placements = records["campus"]
+    department_col, placements_col, checkouts_col = st.columns(3)
+    # The latest record holds the current department
+    if len(student_records):
+        latest = student_records.sort_values("Entry Date").iloc[-1]
+        st.subheader(latest["Student Name"])
+        department_col.metric("Department:", latest["Department"])
+    placements_col.metric("Placement Offers:", len(placements))
+    checkouts_col.metric("Library Checkouts:", len(checkouts))
+
+    st.header("Student Records")
+    st.dataframe(student_records, use_container_width=True)
+    st.header("Placements")
+    st.dataframe(placements, use_container_width=True)
+else:
+    staff_record = records["hr_analytics"]
+    department_col, designation_col, checkouts_col = st.columns(3)
+    if len(staff_record):
+        st.subheader(staff_record["Name"].iloc[0])
+        department_col.metric("Department:", staff_record["Department"].iloc[0])
+        designation_col.metric("Designation:", staff_record["Designation"].iloc[0])
+    checkouts_col.metric("Library Checkouts:", len(checkouts))
+
+    st.header("Staff Record")
+    st.dataframe(staff_record, use_container_width=True)
+
+st.header("Library")
+st.caption("Membership")
+st.dataframe(records["library_members"], use_container_width=True)
+st.caption("Checkouts")
+st.dataframe(checkouts, use_container_width=True)
@@ -0,0 +1,65 @@
+import pandas as pd
+import streamlit as st
+
+from dashboard.cache import cache_stats
+from dashboard.filter_bar import DIAGNOSTICS
+from dashboard.service import SOCKET_PATH, fetch, service_available
+from dashboard.spans import span_frame, summarize, to_jsonl
+from dashboard.store import memory_report
+
+st.set_page_config(page_title="Diagnostics -Institutional Dashboard", page_icon=":bar_chart:", layout="wide", initial_sidebar_state="auto")
+
+# The page is only available when the dashboard is started with DASHBOARD_DIAGNOSTICS=1,
+# otherwise the other pages hide its link
+if not DIAGNOSTICS:
+    st.info("Diagnostics are not enabled on this server.")
+    st.stop()
+
+st.title("Diagnostics")
+st.header("Data Service")
+if service_available():
+    st.write(f"Queries are answered by the data service on `{SOCKET_PATH}`.")
+else:
+    st.write(f"No data service is listening on `{SOCKET_PATH}`; queries run in this process.")
+generation = fetch("data_generation")
+st.write(f"Data version `{generation['version']}`, loaded at {generation['built_at']:%Y-%m-%d %H:%M:%S}.")
+
+st.header("Cache")
+
+stats_df = pd.DataFrame([
+    {
+        "Function": stats.name,
+        "TTL (s)": stats.ttl,
+        "Max Entries": stats.max_entries,
+        "Calls": stats.calls,
+        "Hits": stats.hits,
+        "Misses": stats.misses,
+        "Mean Latency (ms)": round(stats.mean_ms, 3),
+        "Load Time (s)": round(stats.load_seconds, 3),
+    }
+    for stats in cache_stats()
+])
+st.dataframe(stats_df, use_container_width=True)
+
+st.header("Memory")
+# Memory of each dataset as a plain pd.read_csv frame and with its declared schema
+st.dataframe(memory_report(), use_container_width=True)
+
+st.header("Performance")
+# Spans recorded by the Streamlit process and, when it runs, the data service
+sources = {"Streamlit": span_frame()}
+if service_available():
+    sources["Data Service"] = fetch("spans")
+for source, spans in sources.items():
+    st.subheader(f"{source} ({len(spans)} spans)")
+    if spans.empty:
+        st.write("No spans recorded yet; open a dashboard page first.")
+        continue
+    st.dataframe(summarize(spans), use_container_width=True)
+    st.download_button(
+        "Download as JSON lines",
+        to_jsonl(spans),
+        file_name=f"spans-{source.lower().replace(' ', '-')}.jsonl",
+        mime="application/json",
+        key=f"spans_{source}",
+    )